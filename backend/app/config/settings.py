@@ -29,6 +29,19 @@ class Settings(BaseSettings):
     # Recommended range: 0.6 - 0.8 depending on your knowledge base quality
     KNOWLEDGE_RELEVANCE_THRESHOLD: float = float(os.getenv("KNOWLEDGE_RELEVANCE_THRESHOLD", "0.8"))
     
+    # Local embedding server settings
+    # LLAMA_EMBED_URL - llama.cpp server exposing /v1/embeddings; probed at
+    # startup and silently skipped when unreachable
+    LLAMA_EMBED_URL: str = os.environ.get("LLAMA_EMBED_URL", "http://localhost:8082")
+
+    # Semantic cache settings
+    # SEMANTIC_CACHE_THRESHOLD - Minimum cosine similarity between a query's
+    # embedding and a cached entry's embedding for the entry to be served.
+    # Higher values only match near-identical phrasings.
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    # SEMANTIC_CACHE_TTL - Seconds a cached entry stays servable
+    SEMANTIC_CACHE_TTL: int = int(os.getenv("SEMANTIC_CACHE_TTL", "300"))
+
     # File upload settings
     MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024  # 50 MB
     
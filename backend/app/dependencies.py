@@ -1,36 +1,45 @@
 """
 Dependency injection functions for FastAPI.
 """
-import asyncio
+from functools import lru_cache
 from app.services.claude_service import ClaudeService
 from app.services.knowledge_service import KnowledgeService
 from app.services.tools_service import ToolsService
 
 
+@lru_cache(maxsize=1)
 def get_claude_service():
     """
-    Dependency function to get a ClaudeService instance.
+    Dependency function to get the shared ClaudeService instance.
+
+    Cached so every request reuses one service instead of rebuilding it.
     """
     return ClaudeService()
 
 
+@lru_cache(maxsize=1)
 def get_knowledge_service():
     """
-    Dependency function to get a KnowledgeService instance.
+    Dependency function to get the shared KnowledgeService instance.
+
+    Cached so every request reuses one service instead of rebuilding it.
     """
     return KnowledgeService()
 
 
-async def get_tools_service():
+@lru_cache(maxsize=1)
+def get_tools_service():
     """
-    Dependency function to get a ToolsService instance.
-    
-    Ensures the HTTP client gets closed properly when the request completes.
+    Dependency function to get the shared ToolsService instance.
+
+    Cached so every request reuses one service (and its pooled HTTP client)
+    instead of opening a new connection pool per request. The client is
+    closed by the application lifespan handler on shutdown.
     """
-    service = ToolsService()
-    try:
-        yield service
-    finally:
-        # Don't use create_task here as it requires a running event loop
-        # Simply await the close method directly
-        await service.close() 
\ No newline at end of file
+    return ToolsService()
+
+
+async def close_services():
+    """Close pooled resources held by the shared services on shutdown."""
+    await get_tools_service().close()
+    await get_claude_service().aclose()
\ No newline at end of file
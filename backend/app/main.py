@@ -1,11 +1,19 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 import logging
 import sys
 import os
 import time
 
+# Use uvloop for the event loop when available - it cuts per-await overhead
+# across every async endpoint without any router changes
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 # Setup logging at the very beginning
 log_dir = os.path.dirname(os.path.abspath(__file__))
 log_file_path = os.path.join(log_dir, "app.log")
@@ -38,11 +46,23 @@ logger.info(f"CORS_ORIGINS: {settings.BACKEND_CORS_ORIGINS}")
 # Don't log the actual API key for security reasons
 logger.info(f"CLAUDE_API_KEY set: {'Yes' if settings.CLAUDE_API_KEY else 'No'}")
 
+from contextlib import asynccontextmanager
+
+from app.dependencies import close_services
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Release pooled HTTP clients held by the shared service singletons
+    await close_services()
+
 # Create FastAPI app
 app = FastAPI(
     title="Agent Builder API",
     description="API for building agents with Claude",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Set up CORS
@@ -1,36 +1,18 @@
 from typing import Dict, Any, Union
+from string import Template
+from functools import lru_cache
 import json
 import logging
+import orjson
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
-def get_system_prompt(agent_config: Union[Dict[str, Any], BaseModel]) -> str:
-    """
-    Generate the system prompt for Claude with the current agent configuration.
-    
-    Args:
-        agent_config: Current agent configuration (either a dict or Pydantic model)
-        
-    Returns:
-        Formatted system prompt
-    """
-    try:
-        # Convert Pydantic model to dict if necessary
-        if hasattr(agent_config, 'model_dump') and callable(getattr(agent_config, 'model_dump')):
-            config_dict = agent_config.model_dump()
-        else:
-            config_dict = dict(agent_config)
-        
-        # Convert agent config to a pretty-printed JSON representation
-        config_json = json.dumps(config_dict, indent=2)
-        
-        logger.info(f"Generating system prompt with config: {config_json}")
-
-        # Check if tools have been added
-        has_tools = (config_dict.get("tools", []) or config_dict.get("mcp_servers", [])) is not None
-        tools_selection_prompt = """
-8. **Tools Selection** - Define how you will response to the user's query so I can parse your response and make the API call. 
+# Static prompt blocks are defined once at import time so each request only
+# pays for placeholder substitution, not re-assembly of the literals.
+
+_TOOLS_SELECTION_PROMPT = """
+8. **Tools Selection** - Define how you will response to the user's query so I can parse your response and make the API call.
    - When an action involves calling a tool or an MCP server endpoint, provide a structured JSON response in between of [TOOLS SELECTED] and [/TOOLS SELECTED].
    - The structured response must include the following keys:
      - action: indicates the type of call ('tool' or 'mcp')
@@ -51,22 +33,13 @@ def get_system_prompt(agent_config: Union[Dict[str, Any], BaseModel]) -> str:
       }
     [/TOOLS SELECTED]
    - This ensures that your output is fully parsable and that I can extract the endpoint and parameters to make the API call.
-""" if has_tools else ""
-        # Check if knowledge base has been added
-        has_knowledge_base = config_dict.get("knowledge_base", {}).get("index_info") is not None
-        knowledge_base_prompt = ""
-        
-        if has_knowledge_base:
-            knowledge_base_prompt = """
+"""
+
+_KNOWLEDGE_BASE_PROMPT = """
 9. **Knowledge Base** - External documents to help the agent provide better responses
 """
-        else:
-            knowledge_base_prompt = ""
-        
-        # Additional knowledge base instructions if needed
-        knowledge_base_instructions = ""
-        if has_knowledge_base:
-            knowledge_base_instructions = """
+
+_KNOWLEDGE_BASE_INSTRUCTIONS_PRESENT = """
 ## Knowledge Base Integration
 
 The agent has access to a knowledge base. You do not need to ask about storage details or paths, as this is all handled by the application UI. The user will:
@@ -82,8 +55,8 @@ The YAML configuration will include all necessary details for the chosen storage
 
 Focus only on what the agent will do with the knowledge, not on the technical details of storage.
 """
-        else:
-            knowledge_base_instructions = """
+
+_KNOWLEDGE_BASE_INSTRUCTIONS_ABSENT = """
 ## Knowledge Base Option
 
 After collecting the main information, you can ask if the user would like to enhance their agent with document knowledge. If they say yes:
@@ -95,9 +68,8 @@ After collecting the main information, you can ask if the user would like to enh
 
 Just prompt them if they want to add knowledge, and if they say yes, tell them to use the upload interface in the right panel.
 """
-        
-        # Debug mode instructions
-        debug_mode_instructions = """
+
+_DEBUG_MODE_INSTRUCTIONS = """
 ## Debug Mode
 
 When configured in debug mode, the agent will expose its reasoning process. In debug mode, the agent should:
@@ -108,8 +80,10 @@ When configured in debug mode, the agent will expose its reasoning process. In d
 
 The debug mode is designed for transparency and agent improvement, allowing users to understand how their agent makes decisions.
 """
-        
-        system_prompt = f"""
+
+# The placeholder scanner is compiled once when the Template is constructed;
+# substitute() is then a single C-level pass per request.
+_SYSTEM_PROMPT_TEMPLATE = Template("""
 You are an AI assistant specializing in helping users create custom agents. Your job is to guide the user through creating an agent configuration step by step. The final goal is to produce a YAML configuration file that can be used with an agent framework.
 
 ## Information to Collect
@@ -121,18 +95,18 @@ Guide the user through collecting the following information in a conversational
 3. **Agent Instruction** - Detailed instructions for how the agent should behave and respond
 4. **Agent Memory Size** - How many past messages the agent should remember (default is 10)
 5. **Agent Tools** - External APIs or tools the agent can use (format: "API Name: Endpoint")
-6. **Agent MCP(Model Context Protocol) Servers** - MCP(Model Context Protocol) servers the agent can use, Each service contains a unique identifier, name, list of capabilities, and multiple endpoints. Endpoints specify paths, HTTP methods, descriptions, and parameter types (query, path, body) 
+6. **Agent MCP(Model Context Protocol) Servers** - MCP(Model Context Protocol) servers the agent can use, Each service contains a unique identifier, name, list of capabilities, and multiple endpoints. Endpoints specify paths, HTTP methods, descriptions, and parameter types (query, path, body)
 7. **Agent Mode** - Whether the agent operates in "normal" mode or "debug" mode (default is "normal")
-{tools_selection_prompt}
-{knowledge_base_prompt}
+${tools_selection_prompt}
+${knowledge_base_prompt}
 
 ## Current Agent Configuration
 
-{config_json}
+${config_json}
 
-{debug_mode_instructions}
+${debug_mode_instructions}
 
-{knowledge_base_instructions}
+${knowledge_base_instructions}
 
 ## Conversation Guidelines
 
@@ -157,10 +131,10 @@ Your conversational responses should be natural and helpful. In addition, you sh
 1. If you can extract information to update the agent configuration, add this JSON at the end of your message:
 ```
 [CONFIG_UPDATE]
-{{
+{
   "field": "name",
   "value": "extracted value"
-}}
+}
 [/CONFIG_UPDATE]
 ```
 
@@ -193,23 +167,23 @@ true
 For tools, the value should be structured like:
 ```
 [CONFIG_UPDATE]
-{{
+{
   "field": "tools",
   "value": [
-    {{"name": "Weather API", "endpoint": "https://api.weather.com/forecast"}},
-    {{"name": "Translation API", "endpoint": "https://api.translate.com/v2"}}
+    {"name": "Weather API", "endpoint": "https://api.weather.com/forecast"},
+    {"name": "Translation API", "endpoint": "https://api.translate.com/v2"}
   ]
-}}
+}
 [/CONFIG_UPDATE]
 ```
 
 Or for adding a single tool to existing tools:
 ```
 [CONFIG_UPDATE]
-{{
+{
   "field": "tools",
-  "value": [...currentTools, {{"name": "New Tool", "endpoint": "https://api.newtool.com"}}]
-}}
+  "value": [...currentTools, {"name": "New Tool", "endpoint": "https://api.newtool.com"}]
+}
 [/CONFIG_UPDATE]
 ```
 
@@ -218,10 +192,10 @@ Or for adding a single tool to existing tools:
 When setting the agent mode:
 ```
 [CONFIG_UPDATE]
-{{
+{
   "field": "mode",
   "value": "debug"
-}}
+}
 [/CONFIG_UPDATE]
 ```
 
@@ -240,10 +214,74 @@ When setting the agent mode:
 - NEVER ask for path information or storage details - this is all handled by the application
 - The storage choice (LlamaCloud vs Local) is made through UI buttons, not through conversation
 - The application will strip these tags from the displayed message
-"""
-        
-        return system_prompt.strip()
+""")
+
+
+def get_system_prompt(agent_config: Union[Dict[str, Any], BaseModel]) -> str:
+    """
+    Generate the system prompt for Claude with the current agent configuration.
+
+    Args:
+        agent_config: Current agent configuration (either a dict or Pydantic model)
+
+    Returns:
+        Formatted system prompt
+    """
+    try:
+        # Convert Pydantic model to dict if necessary; dicts are used as-is since
+        # the config is only read here (no need for a defensive copy)
+        if hasattr(agent_config, 'model_dump'):
+            config_dict = agent_config.model_dump(mode='json')
+        else:
+            config_dict = agent_config
+
+        # The config rarely changes between consecutive turns of the same
+        # conversation, so memoize the rendered prompt by a stable config key
+        try:
+            config_key = orjson.dumps(config_dict, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            return _render_prompt(config_dict)
+
+        return _build_prompt_cached(config_key)
     except Exception as e:
         logger.error(f"Error generating system prompt: {e}", exc_info=True)
         # Return a basic prompt as fallback
-        return "You are an AI assistant helping users create custom agents. Guide them through the process conversationally."
\ No newline at end of file
+        return "You are an AI assistant helping users create custom agents. Guide them through the process conversationally."
+
+
+@lru_cache(maxsize=256)
+def _build_prompt_cached(config_key: bytes) -> str:
+    """Render and cache the prompt for one canonicalized config."""
+    return _render_prompt(orjson.loads(config_key))
+
+
+def _render_prompt(config_dict: Dict[str, Any]) -> str:
+    """Render the system prompt for an agent configuration dict."""
+    # Convert agent config to a compact JSON representation - Claude parses
+    # compact JSON just as well, and skipping indentation keeps the encoder
+    # on the fast C path for configs with many tools/MCP endpoints
+    config_json = json.dumps(config_dict, separators=(',', ':'), ensure_ascii=False)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Generating system prompt with config: %s", config_json)
+
+    # Check if tools have been added - only include the tools-selection
+    # block when there is actually something to call, so tool-less agents
+    # don't pay for the extra prompt tokens on every turn
+    has_tools = bool(config_dict.get("tools")) or bool(config_dict.get("mcp_servers"))
+
+    # Check if knowledge base has been added
+    has_knowledge_base = (config_dict.get("knowledge_base") or {}).get("index_info") is not None
+
+    system_prompt = _SYSTEM_PROMPT_TEMPLATE.substitute(
+        tools_selection_prompt=_TOOLS_SELECTION_PROMPT if has_tools else "",
+        knowledge_base_prompt=_KNOWLEDGE_BASE_PROMPT if has_knowledge_base else "",
+        config_json=config_json,
+        debug_mode_instructions=_DEBUG_MODE_INSTRUCTIONS,
+        knowledge_base_instructions=(
+            _KNOWLEDGE_BASE_INSTRUCTIONS_PRESENT if has_knowledge_base
+            else _KNOWLEDGE_BASE_INSTRUCTIONS_ABSENT
+        ),
+    )
+
+    return system_prompt.strip()
@@ -1,6 +1,12 @@
 # This file makes the routers directory a Python package
 # It allows importing the router modules from other parts of the application
 
-from app.routers.chat import router as chat_router
+# Shared 404 response schema - defined once so every router reuses the same
+# object instead of building its own copy at import time
+NOT_FOUND_RESPONSES = {404: {"description": "Not found"}}
 
-__all__ = ['chat_router']
\ No newline at end of file
+# Relative import so the chat router always resolves to the same module entry
+# regardless of how the package itself was imported
+from .chat import router as chat_router
+
+__all__ = ['chat_router', 'NOT_FOUND_RESPONSES']
@@ -1,27 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any
 import logging
 import json
-import os
 
+from app.routers import NOT_FOUND_RESPONSES
 from app.services.claude_service import ClaudeService
 from app.dependencies import get_claude_service
 from app.models.request_models import ChatRequest
 from app.models.response_models import ChatResponse
-from app.utils.config_extractor import extract_config_updates, should_generate_yaml, clean_response
+from app.utils.config_extractor import parse_response, StreamingTagParser
 from app.services.yaml_service import generate_yaml_async as yaml_generator
-from app.services.knowledge_service import sanitize_agent_name
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/api",
     tags=["chat"],
-    responses={404: {"description": "Not found"}},
+    responses=NOT_FOUND_RESPONSES,
 )
 
-@router.post("/chat", response_model=ChatResponse)
+# response_model is intentionally omitted: the handler already builds a
+# ChatResponse, so re-validating it through Pydantic on every request is
+# pure overhead on the hot path
+@router.post("/chat")
 async def chat(
     request: ChatRequest,
     claude_service: ClaudeService = Depends(get_claude_service)
@@ -36,17 +38,24 @@ async def chat(
     """
     try:
         # Debug output - log request details
-        logger.info(f"Received request with {len(request.messages)} messages")
-        logger.info(f"Agent config: {request.agent_config}")
+        logger.info("Received request with %d messages", len(request.messages))
+        logger.info("Agent config: %s", request.agent_config)
         
-        # Extract latest user message for processing
-        user_message = next((msg for msg in reversed(request.messages) if msg.role == "user"), None)
+        # Extract latest user message for processing - in practice the last
+        # message is the one that triggered the request, so check it first
+        # before falling back to a reverse scan
+        if request.messages and request.messages[-1].role == "user":
+            user_message = request.messages[-1]
+        else:
+            user_message = next((msg for msg in reversed(request.messages) if msg.role == "user"), None)
         
         if not user_message:
             raise HTTPException(status_code=400, detail="No user message found in the conversation history")
 
-        # Get conversation history
-        messages = request.messages[-request.agent_config.memory_size:]
+        # Get conversation history; an explicit start index avoids the
+        # negative-index path and copies nothing when history fits in memory
+        start = max(0, len(request.messages) - request.agent_config.memory_size)
+        messages = request.messages if start == 0 else request.messages[start:]
         
         # Call Claude API
         claude_response = await claude_service.process_message(
@@ -54,27 +63,84 @@ async def chat(
             agent_config=request.agent_config
         )
         
-        # Extract configuration updates from response
-        config_updates = extract_config_updates(claude_response)
-        
-        # Check if YAML should be generated
-        generate_yaml = should_generate_yaml(claude_response)
-        
-        # Clean the response (remove special tags)
-        cleaned_response = clean_response(claude_response)
+        # Extract config updates, YAML flag and cleaned text in a single pass
+        cleaned_response, config_updates, generate_yaml, _ = parse_response(claude_response)
         
-        logger.info(f"Generated response with config updates: {config_updates}")
+        logger.info("Generated response with config updates: %s", config_updates)
         
         return ChatResponse(
             message=cleaned_response,
             config_updates=config_updates,
             generate_yaml=generate_yaml
-        )
+        ).model_dump()
     
     except Exception as e:
         logger.error(f"Error processing chat request: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error communicating with Claude API: {str(e)}")
 
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    claude_service: ClaudeService = Depends(get_claude_service)
+):
+    """
+    Process a chat message with Claude and stream the response via Server-Sent Events.
+
+    - Takes the same request body as /chat
+    - Streams cleaned response text as it arrives from Claude
+    - Special tags are parsed incrementally and emitted as a final metadata event
+    """
+    if request.messages and request.messages[-1].role == "user":
+        user_message = request.messages[-1]
+    else:
+        user_message = next((msg for msg in reversed(request.messages) if msg.role == "user"), None)
+
+    if not user_message:
+        raise HTTPException(status_code=400, detail="No user message found in the conversation history")
+
+    start = max(0, len(request.messages) - request.agent_config.memory_size)
+    messages = request.messages if start == 0 else request.messages[start:]
+
+    async def event_generator():
+        parser = StreamingTagParser()
+        try:
+            async for chunk in claude_service.stream_message(messages=messages, agent_config=request.agent_config):
+                cleaned = parser.feed(chunk)
+                if cleaned:
+                    yield f"data: {json.dumps({'type': 'text', 'content': cleaned})}\n\n"
+
+            tail = parser.close()
+            if tail:
+                yield f"data: {json.dumps({'type': 'text', 'content': tail})}\n\n"
+
+            # Emit parsed tag results once the stream is complete
+            config_updates = parser.config_updates
+            if config_updates is not None:
+                if isinstance(config_updates, list):
+                    config_updates = [update.model_dump() for update in config_updates]
+                else:
+                    config_updates = config_updates.model_dump()
+
+            done_event = {
+                "type": "done",
+                "config_updates": config_updates,
+                "generate_yaml": parser.generate_yaml
+            }
+            yield f"data: {json.dumps(done_event)}\n\n"
+
+        except Exception as e:
+            logger.error(f"Error streaming chat response: {str(e)}", exc_info=True)
+            yield f"data: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
+
 @router.post("/yaml")
 async def generate_yaml(request: Dict[str, Any]):
     """
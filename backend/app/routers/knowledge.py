@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Path
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form, Path
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import json
 import logging
 
+from app.routers import NOT_FOUND_RESPONSES
 from app.services.knowledge_service import KnowledgeService
 from pydantic import BaseModel
+from app.config.settings import settings
 from app.dependencies import get_knowledge_service
 
 # Set up logging
@@ -12,7 +16,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(
     prefix="/api",
     tags=["knowledge"],
-    responses={404: {"description": "Not found"}},
+    responses=NOT_FOUND_RESPONSES,
 )
 
 # Response models
@@ -82,33 +86,48 @@ class KnowledgeBaseConfig(BaseModel):
 
 @router.post("/upload-file", response_model=FileUploadResponse)
 async def upload_file(
+    request: Request,
     file: UploadFile = File(...),
     agent_name: str = Form(...),
     knowledge_service: KnowledgeService = Depends(get_knowledge_service)
 ):
     """
     Upload a single file for an agent.
-    
+
     - Takes a single file and agent name
     - Saves the file to temporary storage
     - Returns information about the uploaded file
     """
     try:
+        # Reject oversized uploads before any disk I/O. The service keeps a
+        # byte counter during streaming for clients that lie about the header.
+        content_length = int(request.headers.get("content-length", 0))
+        if content_length > settings.MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds maximum size of {settings.MAX_UPLOAD_SIZE} bytes"
+            )
+
         logger.info(f"Uploading file for agent: {agent_name}")
         logger.info(f"Received file: {file.filename}")
-        
+
         result = await knowledge_service.upload_file(file, agent_name)
-        
+
         if not result.get("success", False):
             raise HTTPException(status_code=500, detail=result.get("error", "Failed to upload file"))
-        
+
         return result
-    
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading file: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
 
-@router.get("/files/{agent_name}", response_model=FileListResponse)
+# No response_model here: this read endpoint is polled by the UI, and the
+# service already returns the FileListResponse shape, so skipping Pydantic
+# re-validation lets the orjson default response class serialize it directly
+@router.get("/files/{agent_name}")
 async def get_files(
     agent_name: str = Path(...),
     knowledge_service: KnowledgeService = Depends(get_knowledge_service)
@@ -173,8 +192,7 @@ async def save_to_local(
         logger.info(f"Saving to local storage for agent: {agent_name}")
         
         result = await knowledge_service.create_local_index(agent_name)
-
-        print(f"Result: {result}")
+        logger.debug("Local index result: %s", result)
         
         if not result.get("success", False):
             raise HTTPException(status_code=500, detail=result.get("error", "Failed to save to local storage"))
@@ -185,6 +203,53 @@ async def save_to_local(
         logger.error(f"Error saving to local storage: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error saving to local storage: {str(e)}")
 
+class KnowledgeQueryRequest(BaseModel):
+    """Knowledge query request model"""
+    query: str
+    index_info: str
+    similarity_top_k: int = 3
+
+
+@router.post("/query-local-index/{agent_name}/stream")
+async def stream_local_index_query(
+    agent_name: str,
+    request: KnowledgeQueryRequest,
+    knowledge_service: KnowledgeService = Depends(get_knowledge_service)
+):
+    """
+    Query an agent's local index and stream the synthesized answer via
+    Server-Sent Events.
+
+    - Takes the query and the index's persist directory
+    - Yields answer text as the synthesis LLM produces it, so the first
+      tokens reach the caller well before the full answer is generated
+    """
+    async def event_generator():
+        try:
+            async for chunk in knowledge_service.stream_local_query(
+                agent_name,
+                request.index_info,
+                request.query,
+                similarity_top_k=request.similarity_top_k
+            ):
+                yield f"data: {json.dumps({'type': 'text', 'content': chunk})}\n\n"
+
+            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+
+        except Exception as e:
+            logger.error(f"Error streaming knowledge query: {str(e)}", exc_info=True)
+            yield f"data: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
+
+
 @router.delete("/files/{agent_name}/{file_name}", response_model=FileRemovalResponse)
 async def remove_file(
     agent_name: str = Path(...),
@@ -1,11 +1,24 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
-from typing import List, Dict, Any
+from typing import List
+from collections import deque
 import logging
 import os
-import json
+import orjson
 import asyncio
-from datetime import datetime
+import aiofiles
+import aiofiles.os
+
+from app.routers import NOT_FOUND_RESPONSES
+
+# watchdog lets the SSE stream wake up on file-modified events instead of
+# polling; when it is unavailable the generator falls back to a slow poll
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -13,44 +26,228 @@ logger = logging.getLogger(__name__)
 router = APIRouter(
     prefix="/api/logs",
     tags=["logs"],
-    responses={404: {"description": "Not found"}},
+    responses=NOT_FOUND_RESPONSES,
 )
 
 # Configuration for log file
 LOG_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "app.log")
 
+# Number of lines returned by the /current endpoint
+TAIL_LINES = 300
+
+# Block size for reading the log file backwards
+_TAIL_BLOCK_SIZE = 64 * 1024
+
+# SSE frame batching limits - flush once either is reached so a burst of
+# log lines becomes a handful of frames instead of one frame per line
+_SSE_BATCH_LINES = 64
+_SSE_BATCH_BYTES = 4 * 1024
+
+
+def _read_tail(path: str, max_lines: int = TAIL_LINES) -> List[str]:
+    """
+    Read the last max_lines lines of a file without loading it fully.
+
+    Seeks backwards from the end in fixed-size blocks and stops as soon as
+    enough newlines have been seen, so cost is bounded by the tail size
+    rather than the full log size.
+
+    Args:
+        path: Path to the file to read
+        max_lines: Maximum number of lines to return
+
+    Returns:
+        List of decoded lines with trailing newlines stripped
+    """
+    chunks = deque()
+    newlines = 0
+
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+
+        while pos > 0 and newlines <= max_lines:
+            read_size = min(_TAIL_BLOCK_SIZE, pos)
+            pos -= read_size
+            f.seek(pos)
+            chunk = f.read(read_size)
+            chunks.appendleft(chunk)
+            newlines += chunk.count(b'\n')
+
+    lines = b"".join(chunks).splitlines()[-max_lines:]
+    return [line.decode('utf-8', 'replace') for line in lines]
+
+
+# Set once the log file is known to exist so steady-state requests skip the
+# per-request stat call; cleared again if the file disappears underneath us
+_log_file_checked = False
+
+
+def _read_tail_or_bootstrap(path: str, max_lines: int = TAIL_LINES) -> List[str]:
+    """
+    Sync worker for get_current_logs: tail the log file, creating it first
+    if it does not exist yet. Kept synchronous so the whole exists/create/read
+    sequence runs in a single thread-pool hop.
+    """
+    global _log_file_checked
+
+    if not _log_file_checked and not os.path.exists(path):
+        logger.warning(f"Log file not found at {path}")
+        # Create an empty log file if it doesn't exist
+        with open(path, 'w') as f:
+            f.write("Log file initialized\n")
+        _log_file_checked = True
+        return ["Log file initialized"]
+
+    _log_file_checked = True
+    try:
+        return _read_tail(path, max_lines)
+    except FileNotFoundError:
+        # Deleted after the cached check - redo the bootstrap next time
+        _log_file_checked = False
+        return _read_tail_or_bootstrap(path, max_lines)
+
+# Queues of connected SSE clients, notified from the watchdog thread.
+# Entries are (event loop, queue) pairs because the observer runs outside
+# the loop and must hand off via call_soon_threadsafe.
+_stream_queues = set()
+
+_observer = None
+_observer_failed = False
+
+
+def _notify(queue: asyncio.Queue):
+    """Wake a stream queue; a full queue already has a pending wakeup."""
+    try:
+        queue.put_nowait(None)
+    except asyncio.QueueFull:
+        pass
+
+
+if WATCHDOG_AVAILABLE:
+    class _LogFileEventHandler(FileSystemEventHandler):
+        """Fans out log-file modification events to all connected streams."""
+
+        def on_modified(self, event):
+            if event.src_path == LOG_FILE_PATH:
+                for loop, queue in list(_stream_queues):
+                    loop.call_soon_threadsafe(_notify, queue)
+
+
+def _ensure_observer() -> bool:
+    """
+    Start the shared watchdog observer on first use.
+
+    Returns:
+        True if edge-triggered wakeups are available, False if callers
+        should fall back to polling.
+    """
+    global _observer, _observer_failed
+
+    if not WATCHDOG_AVAILABLE or _observer_failed:
+        return False
+
+    if _observer is None:
+        try:
+            observer = Observer()
+            observer.daemon = True
+            observer.schedule(_LogFileEventHandler(), os.path.dirname(LOG_FILE_PATH))
+            observer.start()
+            _observer = observer
+        except Exception as e:
+            logger.warning(f"Log file watcher unavailable, falling back to polling: {e}")
+            _observer_failed = True
+            return False
+
+    return True
+
+
 async def log_stream_generator():
     """Generator function to stream log updates."""
     last_position = 0
-    
-    while True:
-        try:
-            if not os.path.exists(LOG_FILE_PATH):
+
+    # Persistent handle on the log file - opened once per stream and only
+    # reopened when rotation is detected, instead of a fresh open per tick
+    file = None
+    inode = None
+    partial = b""
+
+    # A single-slot queue coalesces bursts of modification events into one
+    # wakeup; the read loop below drains everything written since last time
+    queue = asyncio.Queue(maxsize=1)
+    loop = asyncio.get_running_loop()
+    watching = _ensure_observer()
+    if watching:
+        _stream_queues.add((loop, queue))
+
+    try:
+        while True:
+            try:
+                # Async stat doubles as the existence check so the event loop
+                # never blocks on filesystem metadata
+                try:
+                    stat = await aiofiles.os.stat(LOG_FILE_PATH)
+                except FileNotFoundError:
+                    if file is not None:
+                        await file.close()
+                        file = None
+                    await asyncio.sleep(1)
+                    continue
+
+                # Reopen only when the file was rotated (new inode) or
+                # truncated below our read position
+                if file is None or stat.st_ino != inode or stat.st_size < last_position:
+                    if file is not None:
+                        await file.close()
+                    file = await aiofiles.open(LOG_FILE_PATH, 'rb')
+                    inode = stat.st_ino
+                    last_position = 0
+                    partial = b""
+
+                # Read everything appended since the last wakeup
+                data = await file.read()
+                if data:
+                    last_position += len(data)
+                    partial += data
+
+                    # The last element may be an incomplete line - keep it
+                    # buffered until its newline arrives
+                    lines = partial.split(b'\n')
+                    partial = lines.pop()
+
+                    batch = []
+                    batch_bytes = 0
+                    for raw in lines:
+                        line = raw.decode('utf-8', 'replace').rstrip()
+                        if not line.strip():
+                            continue
+                        batch.append(line)
+                        batch_bytes += len(raw)
+                        if len(batch) >= _SSE_BATCH_LINES or batch_bytes >= _SSE_BATCH_BYTES:
+                            yield b"data: " + orjson.dumps({'logs': batch}) + b"\n\n"
+                            batch = []
+                            batch_bytes = 0
+                    if batch:
+                        yield b"data: " + orjson.dumps({'logs': batch}) + b"\n\n"
+
+                if watching:
+                    # Sleep until the watcher reports a write; the timeout is
+                    # only a safety net against missed events
+                    try:
+                        await asyncio.wait_for(queue.get(), timeout=5.0)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    # No watcher available - poll slowly
+                    await asyncio.sleep(1.0)
+
+            except Exception as e:
+                logger.error(f"Error in log stream: {str(e)}")
                 await asyncio.sleep(1)
-                continue
-                
-            with open(LOG_FILE_PATH, 'r') as file:
-                # Move to last known position
-                file.seek(last_position)
-                
-                # Read new lines
-                new_lines = file.readlines()
-                
-                if new_lines:
-                    # Update last position
-                    last_position = file.tell()
-                    
-                    # Process and send new lines
-                    for line in new_lines:
-                        if line.strip():
-                            yield f"data: {json.dumps({'logs': [line.rstrip()]})}\n\n"
-            
-            # Wait before checking for new logs
-            await asyncio.sleep(0.1)
-            
-        except Exception as e:
-            logger.error(f"Error in log stream: {str(e)}")
-            await asyncio.sleep(1)
+    finally:
+        if file is not None:
+            await file.close()
+        if watching:
+            _stream_queues.discard((loop, queue))
 
 @router.get("/stream")
 async def stream_logs():
@@ -79,24 +276,10 @@ async def get_current_logs():
         dict: Dictionary containing log lines
     """
     try:
-        if not os.path.exists(LOG_FILE_PATH):
-            logger.warning(f"Log file not found at {LOG_FILE_PATH}")
-            # Create an empty log file if it doesn't exist
-            with open(LOG_FILE_PATH, 'w') as f:
-                f.write("Log file initialized\n")
-            return {"logs": ["Log file initialized"]}
-        
-        # Read the last 300 lines of the log file
-        with open(LOG_FILE_PATH, 'r') as file:
-            # Read all lines and reverse them
-            all_lines = file.readlines()
-            
-            # Take the last 300 lines
-            lines = all_lines[-300:] if len(all_lines) > 300 else all_lines
-            
-            # Strip newlines
-            lines = [line.rstrip() for line in lines]
-        
+        # Run the blocking file I/O in a worker thread so concurrent requests
+        # are not serialized behind disk access on the event loop
+        lines = await asyncio.to_thread(_read_tail_or_bootstrap, LOG_FILE_PATH, TAIL_LINES)
+
         logger.info(f"Returning {len(lines)} log lines")
         return {"logs": lines}
     
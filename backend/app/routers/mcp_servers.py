@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 import logging
 import traceback
+from collections import OrderedDict
 from datetime import datetime
-from app.services.mcp_services import connect_sse_with_timeout, process_sse_events, load_mcp_servers, save_mcp_servers, add_mcp_server
+from uuid import uuid4
+from app.services.mcp_services import connect_sse_with_timeout, process_sse_events, load_mcp_servers, load_mcp_servers_by_name, save_mcp_servers, add_mcp_server
 from app.models.mcp_models import MCPServerInput
 
 router = APIRouter(prefix="/api/mcp-servers", tags=["MCP Servers"])
@@ -10,38 +12,74 @@ router = APIRouter(prefix="/api/mcp-servers", tags=["MCP Servers"])
 # Configure logging
 logger = logging.getLogger(__name__)
 
-@router.post("/add")
-async def add_mcp_server_route(server: MCPServerInput):
-    """
-    Add a new MCP server by connecting to its SSE endpoint and discovering services.
-    """
+# In-process status records for background discovery tasks, keyed by task id.
+# Polled via GET /status/{task_id}; bounded so finished records don't
+# accumulate for the life of the process.
+_discovery_tasks = OrderedDict()
+_MAX_DISCOVERY_TASKS = 100
+
+
+def _record_task(task_id: str, record: dict):
+    """Store a task status record, evicting the oldest once over the cap."""
+    _discovery_tasks[task_id] = record
+    _discovery_tasks.move_to_end(task_id)
+    while len(_discovery_tasks) > _MAX_DISCOVERY_TASKS:
+        _discovery_tasks.popitem(last=False)
+
+
+async def _discover_services(sse_url: str):
+    """Run the SSE handshake and return the discovered services."""
+    session, response = await connect_sse_with_timeout(sse_url)
+    services = await process_sse_events(session, response)
+
+    if not services:
+        raise HTTPException(status_code=400,
+                          detail="No services discovered from the MCP server")
+    return services
+
+
+async def _discover_and_store(task_id: str, server: MCPServerInput):
+    """Background task: discover services for a new server and persist it."""
     try:
-        # Connect to the SSE endpoint
-        session, response = await connect_sse_with_timeout(server.sse_url)
-        
-        # Process the SSE events to discover services
-        services = await process_sse_events(session, response)
-        
-        if not services:
-            raise HTTPException(status_code=400, 
-                              detail="No services discovered from the MCP server")
-        
-        # Create the MCP server record
+        services = await _discover_services(server.sse_url)
         new_server = await add_mcp_server(server, services)
-        
-        return {
+        _record_task(task_id, {
+            "status": "completed",
             "message": "MCP server added successfully",
             "server": new_server
-        }
-        
-    except HTTPException:
-        # Re-raise FastAPI HTTP exceptions
-        raise
+        })
+    except HTTPException as e:
+        _record_task(task_id, {"status": "failed", "detail": e.detail})
     except Exception as e:
         logger.error(traceback.format_exc())
         logger.error(f"Error adding MCP server: {str(e)}")
-        raise HTTPException(status_code=500, 
-                          detail=f"Error adding MCP server: {str(e)}")
+        _record_task(task_id, {"status": "failed", "detail": str(e)})
+
+
+@router.post("/add", status_code=202)
+async def add_mcp_server_route(server: MCPServerInput, background_tasks: BackgroundTasks):
+    """
+    Add a new MCP server by connecting to its SSE endpoint and discovering services.
+
+    Discovery runs in the background so the response does not wait on the
+    remote server; poll /status/{task_id} for the outcome.
+    """
+    task_id = uuid4().hex
+    _record_task(task_id, {"status": "pending"})
+    background_tasks.add_task(_discover_and_store, task_id, server)
+
+    return {"task_id": task_id, "status": "pending"}
+
+
+@router.get("/status/{task_id}")
+async def get_discovery_status(task_id: str):
+    """
+    Get the status of a background add/refresh task.
+    """
+    task = _discovery_tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"Unknown task id '{task_id}'")
+    return task
 
 @router.get("/list")
 async def list_mcp_servers():
@@ -49,7 +87,7 @@ async def list_mcp_servers():
     List all registered MCP servers.
     """
     servers = await load_mcp_servers()
-    print(servers)
+    logger.debug("Registered MCP servers: %s", servers)
     return {"servers": servers}
 
 @router.get("/{server_name}")
@@ -57,11 +95,11 @@ async def get_mcp_server(server_name: str):
     """
     Get details of a specific MCP server.
     """
-    servers = await load_mcp_servers()
-    for server in servers:
-        if server["name"] == server_name:
-            return server
-    
+    servers_by_name = await load_mcp_servers_by_name()
+    server = servers_by_name.get(server_name)
+    if server is not None:
+        return server
+
     raise HTTPException(status_code=404, detail=f"MCP server '{server_name}' not found")
 
 @router.delete("/{server_name}")
@@ -69,57 +107,60 @@ async def delete_mcp_server(server_name: str):
     """
     Delete an MCP server.
     """
-    servers = await load_mcp_servers()
-    initial_count = len(servers)
-    
-    servers = [server for server in servers if server["name"] != server_name]
-    
-    if len(servers) == initial_count:
+    servers_by_name = await load_mcp_servers_by_name()
+    if server_name not in servers_by_name:
         raise HTTPException(status_code=404, detail=f"MCP server '{server_name}' not found")
-    
+
+    servers = [server for name, server in servers_by_name.items() if name != server_name]
     await save_mcp_servers(servers)
     return {"message": f"MCP server '{server_name}' deleted"}
 
-@router.post("/refresh/{server_name}")
-async def refresh_mcp_server(server_name: str):
-    """
-    Refresh the services for a specific MCP server.
-    """
-    servers = await load_mcp_servers()
-    
-    target_server = None
-    for server in servers:
-        if server["name"] == server_name:
-            target_server = server
-            break
-    
-    if not target_server:
-        raise HTTPException(status_code=404, detail=f"MCP server '{server_name}' not found")
-    
+async def _refresh_and_store(task_id: str, server_name: str):
+    """Background task: re-discover services for an existing server."""
     try:
-        # Connect to the SSE endpoint
-        session, response = await connect_sse_with_timeout(target_server["sse_url"])
-        
-        # Process the SSE events to discover services
-        services = await process_sse_events(session, response)
-        
-        if not services:
-            raise HTTPException(status_code=400, 
-                              detail="No services discovered from the MCP server")
-        
+        servers_by_name = await load_mcp_servers_by_name()
+        target_server = servers_by_name.get(server_name)
+        if not target_server:
+            _record_task(task_id, {
+                "status": "failed",
+                "detail": f"MCP server '{server_name}' not found"
+            })
+            return
+
+        services = await _discover_services(target_server["sse_url"])
+
         # Update the server record
         target_server["services"] = services
         target_server["last_connected"] = datetime.now().isoformat()
-        
+
         # Save the updated servers
-        await save_mcp_servers(servers)
-        
-        return {
+        await save_mcp_servers(list(servers_by_name.values()))
+
+        _record_task(task_id, {
+            "status": "completed",
             "message": f"MCP server '{server_name}' refreshed",
             "server": target_server
-        }
-        
+        })
+    except HTTPException as e:
+        _record_task(task_id, {"status": "failed", "detail": e.detail})
     except Exception as e:
         logger.error(f"Error refreshing MCP server: {str(e)}")
-        raise HTTPException(status_code=500, 
-                          detail=f"Error refreshing MCP server: {str(e)}")
\ No newline at end of file
+        _record_task(task_id, {"status": "failed", "detail": str(e)})
+
+
+@router.post("/refresh/{server_name}", status_code=202)
+async def refresh_mcp_server(server_name: str, background_tasks: BackgroundTasks):
+    """
+    Refresh the services for a specific MCP server.
+
+    Discovery runs in the background; poll /status/{task_id} for the outcome.
+    """
+    servers_by_name = await load_mcp_servers_by_name()
+    if server_name not in servers_by_name:
+        raise HTTPException(status_code=404, detail=f"MCP server '{server_name}' not found")
+
+    task_id = uuid4().hex
+    _record_task(task_id, {"status": "pending"})
+    background_tasks.add_task(_refresh_and_store, task_id, server_name)
+
+    return {"task_id": task_id, "status": "pending"}
\ No newline at end of file
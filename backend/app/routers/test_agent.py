@@ -1,16 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict, Any, Optional
+from fastapi.responses import StreamingResponse
+from functools import lru_cache
+from string import Template
+from typing import Annotated, List, Dict, Any
+import asyncio
 import logging
 import re
 import yaml
 from pydantic import BaseModel, Field
 import json
+import orjson
 
+from app.routers import NOT_FOUND_RESPONSES
 from app.services.claude_service import ClaudeService
 from app.services.knowledge_service import KnowledgeService
-from app.services.yaml_service import generate_yaml_async
-from app.services.tools_service import ToolsService
-from app.models.request_models import ChatMessage
+from app.services.yaml_service import build_complete_config
+from app.services.semantic_cache import SemanticCache
+from app.services.tools_service import ToolsService, build_native_tools, generate_tools_description
 from app.dependencies import get_claude_service, get_knowledge_service, get_tools_service
 from app.config.settings import settings
 
@@ -20,9 +26,152 @@ logger = logging.getLogger(__name__)
 router = APIRouter(
     prefix="/api",
     tags=["test-agent"],
-    responses={404: {"description": "Not found"}},
+    responses=NOT_FOUND_RESPONSES,
 )
 
+# Shared default for .get() chains on optional config sections - avoids
+# allocating a throwaway empty dict on every lookup. Never mutate this.
+_EMPTY: Dict[str, Any] = {}
+
+# Safety bound on consecutive native tool rounds in one request
+_MAX_TOOL_ROUNDS = 5
+
+# Cheap gate in front of knowledge retrieval: only messages that look like
+# questions or information requests trigger a vector query. Compiled once at
+# module scope so there is no per-request pattern build.
+_KB_KEYWORD_RE = re.compile(
+    r"\b(?:what|who|when|where|why|how|which|explain|describe|summarize|define|tell me about|information)\b|\?",
+    re.IGNORECASE,
+)
+
+# Static prompt scaffold parsed once at import; only the per-config fields
+# are substituted at request time
+_SYSTEM_PROMPT_TEMPLATE = Template("""
+You are ${name}, an AI assistant.
+
+${description}
+
+CURRENT MODE: ${mode}
+
+When in debug mode, you must structure your response in exactly this format:
+```
+QUERY ANALYSIS:
+[Your analysis of the user's query]
+
+KNOWLEDGE SOURCES:
+[List of knowledge sources used]
+
+TOOL SELECTION:
+[Your tool selection reasoning]
+```
+
+[Your actual response to the user in plain text, not in a code block]
+
+${instruction}
+
+${combined_tools_info}
+
+Remember to act consistently with your configuration and purpose.
+""")
+
+
+def _render_system_prompt(complete_config: Dict[str, Any]) -> str:
+    """
+    Assemble the test-agent system prompt from a complete configuration.
+
+    Args:
+        complete_config: Fully resolved agent configuration
+
+    Returns:
+        The system prompt string
+    """
+    mode = complete_config.get("config", _EMPTY).get("mode", "normal")
+
+    return _SYSTEM_PROMPT_TEMPLATE.substitute(
+        name=complete_config.get("name", "AI Assistant"),
+        description=complete_config.get("description", ""),
+        mode=mode.upper(),
+        instruction=complete_config.get("instruction", ""),
+        combined_tools_info=generate_tools_description(complete_config),
+    ).strip()
+
+
+@lru_cache(maxsize=256)
+def _system_prompt_cached(config_key: bytes) -> str:
+    """Build the prompt once per distinct config; steady-state turns reuse it."""
+    return _render_system_prompt(orjson.loads(config_key))
+
+
+def create_agent_prompt(complete_config: Dict[str, Any]) -> str:
+    """
+    Return the system prompt for a configuration, memoized by its content.
+
+    Args:
+        complete_config: Fully resolved agent configuration
+
+    Returns:
+        The system prompt string
+    """
+    try:
+        config_key = orjson.dumps(complete_config, option=orjson.OPT_SORT_KEYS)
+    except TypeError:
+        # Non-serializable values - fall back to building the prompt directly
+        return _render_system_prompt(complete_config)
+    return _system_prompt_cached(config_key)
+
+
+class _ClaudeCallBatcher:
+    """
+    Coalesce concurrent Claude calls into a single gather() submission.
+
+    Requests arriving within the window (repeated "test" clicks, CI scripts
+    firing many test requests) are dispatched together, so their network
+    sends overlap instead of each awaiting the API round-trip in turn. A
+    lone request only pays the window once before its send starts.
+    """
+
+    _WINDOW_SECONDS = 0.02
+
+    def __init__(self):
+        self._pending = []
+        self._flush_task = None
+
+    async def submit(self, claude_service: ClaudeService,
+                     messages: List[Dict[str, Any]], system_prompt: str) -> str:
+        """Queue a call and wait for its result from the next batch flush."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((future, claude_service, messages, system_prompt))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+        return await future
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self._WINDOW_SECONDS)
+        batch, self._pending = self._pending, []
+        self._flush_task = None
+
+        results = await asyncio.gather(
+            *(service.send_message_with_custom_prompt(messages=messages, system_prompt=system_prompt)
+              for _, service, messages, system_prompt in batch),
+            return_exceptions=True,
+        )
+        for (future, _, _, _), result in zip(batch, results):
+            if future.cancelled():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+_claude_batcher = _ClaudeCallBatcher()
+
+# Near-duplicate queries during QA ("what's the weather" / "tell me the
+# weather") short-circuit to a prior response by embedding similarity,
+# namespaced by system prompt so different agents never cross-hit
+_semantic_cache = SemanticCache()
+
+
 # Request model for testing an agent
 class TestAgentRequest(BaseModel):
     message: str = Field(..., description="User message to send to the agent")
@@ -34,14 +183,138 @@ class TestAgentRequest(BaseModel):
 class TestAgentResponse(BaseModel):
     message: str = Field(..., description="Agent's response message")
 
-# Use dependencies from app.dependencies instead of local definitions
+# Use dependencies from app.dependencies instead of local definitions.
+# Annotated aliases use FastAPI's newer resolution path, which caches a
+# dependency once per request instead of re-resolving it per parameter.
+ClaudeDep = Annotated[ClaudeService, Depends(get_claude_service)]
+KnowledgeDep = Annotated[KnowledgeService, Depends(get_knowledge_service)]
+ToolsDep = Annotated[ToolsService, Depends(get_tools_service)]
+
+async def _prepare_agent_call(
+    request: TestAgentRequest,
+    knowledge_service: KnowledgeService
+) -> tuple:
+    """
+    Resolve the agent configuration into the messages and system prompt for
+    a Claude call, including knowledge-base augmentation when applicable.
+
+    Shared by the blocking and streaming test-agent endpoints.
+
+    Args:
+        request: Incoming test-agent request
+        knowledge_service: Service used for knowledge retrieval
+
+    Returns:
+        Tuple of (messages, system_prompt, complete_config)
+    """
+    logger.info("--------------------------------")
+    logger.info("Initial agent config: %s", request.agent_config)
+    logger.info("--------------------------------")
+
+    # Resolve the complete configuration directly as a dict - dumping to
+    # YAML and parsing it back added nothing but serialization cost
+    complete_config = await build_complete_config(request.agent_config)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Generated configuration:\n%s",
+                     yaml.dump(complete_config, sort_keys=False, default_flow_style=False))
+
+    # Determine mode (normal/debug) from final YAML
+    mode = complete_config.get("config", _EMPTY).get("mode", "normal")
+    logger.info("Current mode from YAML config: %s", mode)
+
+    # Kick off prompt assembly in a worker thread so it overlaps with the
+    # knowledge retrieval started below (on cache hits it returns
+    # immediately either way)
+    prompt_task = asyncio.create_task(asyncio.to_thread(create_agent_prompt, complete_config))
+
+    # Build the message list as plain dicts - history already passed
+    # request validation and the Claude service consumes dicts directly,
+    # so wrapping each entry in a model adds nothing but per-turn overhead
+    messages: List[Dict[str, Any]] = [
+        {"role": msg["role"], "content": msg["content"]}
+        for msg in request.history
+    ]
+
+    # User message appended at the end
+    messages.append({"role": "user", "content": request.message})
+
+    # Check if knowledge retrieval is needed - single lookup, missing or
+    # empty sections both fall through to the empty dict
+    knowledge_base = complete_config.get("knowledge_base") or {}
+    has_knowledge_base = bool(knowledge_base.get("index_info"))
+
+    if has_knowledge_base and not _KB_KEYWORD_RE.search(request.message):
+        logger.info("Message does not look like an information request, skipping knowledge retrieval")
+        has_knowledge_base = False
+
+    context_task = None
+    if has_knowledge_base:
+        logger.info("Knowledge base exists, attempting retrieval")
+
+        # Relevance threshold for knowledge retrieval
+        relevance_threshold = settings.KNOWLEDGE_RELEVANCE_THRESHOLD
+        logger.info("Using relevance threshold: %s", relevance_threshold)
+
+        # Query the knowledge base concurrently with prompt assembly
+        context_task = asyncio.create_task(knowledge_service.query_knowledge_base(
+            request.message,
+            complete_config,
+            similarity_top_k=1,  # Only get the most relevant document
+            relevance_threshold=relevance_threshold
+        ))
+
+    system_prompt = await prompt_task
+
+    # The full prompt is multi-KB - only build the log record when a
+    # debug sink will actually use it
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Generated system prompt:\n%s", system_prompt)
+
+    if context_task is not None:
+        # A retrieval failure should degrade to an unaugmented query, not
+        # fail the whole request
+        try:
+            retrieved_context = await context_task
+        except Exception as e:
+            logger.error(f"Knowledge retrieval failed, continuing without context: {str(e)}", exc_info=True)
+            retrieved_context = None
+
+        if retrieved_context:
+            logger.info("Retrieved relevant document - augmenting user query")
+            logger.debug("Retrieved context:\n%s", retrieved_context)
+            augmented_message = f"""
+{request.message}
+
+[Retrieved Knowledge]
+{retrieved_context}
+[End Retrieved Knowledge]
+
+Please use the retrieved knowledge above to help answer my question, and cite the sources if appropriate.
+"""
+            # Swap in the augmented content
+            messages[-1] = {"role": "user", "content": augmented_message}
+        else:
+            logger.info("No relevant documents found above threshold: %s", relevance_threshold)
+            logger.info("Proceeding with regular query without knowledge augmentation")
+
+    return messages, system_prompt, complete_config
+
+
+def _response_text(response_data: Dict[str, Any]) -> str:
+    """Join the text blocks of a Claude API response into a single string."""
+    return "".join(
+        block.get("text", "")
+        for block in response_data.get("content", [])
+        if block.get("type") == "text"
+    )
+
 
 @router.post("/test-agent", response_model=TestAgentResponse)
 async def test_agent(
     request: TestAgentRequest,
-    claude_service: ClaudeService = Depends(get_claude_service),
-    knowledge_service: KnowledgeService = Depends(get_knowledge_service),
-    tools_service: ToolsService = Depends(get_tools_service)
+    claude_service: ClaudeDep,
+    knowledge_service: KnowledgeDep,
+    tools_service: ToolsDep
 ):
     """
     Test an agent with a loaded YAML configuration
@@ -54,127 +327,90 @@ async def test_agent(
     - Returns Claude's final response
     """
     try:
-        logger.info(f"--------------------------------")
-        logger.info(f"Initial agent config: {request.agent_config}")
-        logger.info(f"--------------------------------")
-        
-        # Generate the complete YAML configuration from the agent config
-        yaml_content = await generate_yaml_async(request.agent_config)
-        logger.debug(f"Generated YAML configuration:\n{yaml_content}")
-        
-        # Parse the generated YAML back to a dict
-        complete_config = yaml.safe_load(yaml_content)
-        
-        # Determine mode (normal/debug) from final YAML
-        mode = complete_config.get("config", {}).get("mode", "normal")
-        logger.info(f"Current mode from YAML config: {mode}")
-        
-        # Basic metadata
-        name = complete_config.get("name", "AI Assistant")
-        description = complete_config.get("description", "")
-        instruction = complete_config.get("instruction", "")
-        
-        # Generate tools description using the tools service
-        combined_tools_info = tools_service.generate_tools_description(complete_config)
-        
-        # Create the system prompt
-        system_prompt = f"""
-You are {name}, an AI assistant.
+        messages, system_prompt, complete_config = await _prepare_agent_call(request, knowledge_service)
 
-{description}
+        # Configs that declare tools go through Anthropic's native tool
+        # protocol: invocations arrive as structured tool_use blocks and
+        # results return as tool_result blocks in the same conversation, so
+        # the follow-up call reuses the cached prefix instead of re-sending
+        # formatted results as prose
+        tools_schema, tool_specs = build_native_tools(complete_config)
+        if tools_schema:
+            response_data = await claude_service.send_message_with_tools(
+                messages, system_prompt, tools_schema
+            )
 
-CURRENT MODE: {mode.upper()}
+            rounds = 0
+            while response_data.get("stop_reason") == "tool_use" and rounds < _MAX_TOOL_ROUNDS:
+                rounds += 1
+                tool_uses = [
+                    block for block in response_data.get("content", [])
+                    if block.get("type") == "tool_use"
+                ]
+                logger.info("Native tool round %s: executing %s invocation(s)", rounds, len(tool_uses))
 
-When in debug mode, you must structure your response in exactly this format:
-```
-QUERY ANALYSIS:
-[Your analysis of the user's query]
+                async def _run_tool(block):
+                    spec = tool_specs.get(block["name"])
+                    if spec is None:
+                        raise ValueError(f"Unknown tool: {block['name']}")
+                    return await tools_service.execute_native_tool(spec, block.get("input") or {})
 
-KNOWLEDGE SOURCES:
-[List of knowledge sources used]
+                # Execute all invocations concurrently - total wall time is
+                # the slowest call instead of the sum
+                raw_results = await asyncio.gather(
+                    *(_run_tool(block) for block in tool_uses),
+                    return_exceptions=True
+                )
 
-TOOL SELECTION:
-[Your tool selection reasoning]
-```
+                result_blocks = []
+                for block, result in zip(tool_uses, raw_results):
+                    if isinstance(result, BaseException):
+                        logger.error(f"Error executing tool {block['name']}: {str(result)}", exc_info=result)
+                        result_blocks.append({
+                            "type": "tool_result",
+                            "tool_use_id": block["id"],
+                            "content": f"Error: {str(result)}",
+                            "is_error": True
+                        })
+                    else:
+                        result_blocks.append({
+                            "type": "tool_result",
+                            "tool_use_id": block["id"],
+                            "content": orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
+                        })
 
-[Your actual response to the user in plain text, not in a code block]
+                messages.append({"role": "assistant", "content": response_data["content"]})
+                messages.append({"role": "user", "content": result_blocks})
 
-{instruction}
+                response_data = await claude_service.send_message_with_tools(
+                    messages, system_prompt, tools_schema
+                )
 
-{combined_tools_info}
+            final_response = _response_text(response_data)
+            logger.info("Claude's final response:\n%s", final_response)
+            return TestAgentResponse(message=final_response)
 
-Remember to act consistently with your configuration and purpose.
-""".strip()
-        
-        logger.info(f"--------------------------------")
-        logger.info(f"Generated system prompt:\n{system_prompt}")
-        logger.info(f"--------------------------------")
-        
-        # Construct chat messages
-        messages = []
-        for msg in request.history:
-            messages.append(ChatMessage(
-                role=msg["role"],
-                content=msg["content"]
-            ))
-        
-        # User message appended at the end
-        user_message = ChatMessage(
-            role="user",
-            content=request.message
-        )
-        messages.append(user_message)
-        
-        # Check if knowledge retrieval is needed
-        has_knowledge_base = "knowledge_base" in complete_config and (
-            complete_config["knowledge_base"].get("index_info")
+        # No tools declared - try the semantic cache before spending a
+        # Claude call. Only single-turn requests are eligible: with history
+        # present the last message alone doesn't determine the answer.
+        single_turn = len(messages) == 1
+        if single_turn:
+            cached_response = await _semantic_cache.get(system_prompt, messages[-1]["content"])
+            if cached_response is not None:
+                logger.info("Semantic cache hit, skipping Claude API call")
+                return TestAgentResponse(message=cached_response)
+
+        # Plain text call; the batcher overlaps sends from any concurrent
+        # test requests
+        claude_response = await _claude_batcher.submit(
+            claude_service, messages, system_prompt
         )
-        
-        if has_knowledge_base:
-            logger.info("Knowledge base exists, attempting retrieval")
-            
-            # Relevance threshold for knowledge retrieval
-            relevance_threshold = settings.KNOWLEDGE_RELEVANCE_THRESHOLD
-            logger.info(f"Using relevance threshold: {relevance_threshold}")
-            
-            # Query the knowledge base
-            retrieved_context = await knowledge_service.query_knowledge_base(
-                request.message, 
-                complete_config,
-                similarity_top_k=1,  # Only get the most relevant document
-                relevance_threshold=relevance_threshold
-            )
-            
-            if retrieved_context:
-                logger.info("Retrieved relevant document - augmenting user query")
-                print("--------------------------------")
-                print(retrieved_context)
-                print("--------------------------------")
-                augmented_message = f"""
-{request.message}
 
-[Retrieved Knowledge]
-{retrieved_context}
-[End Retrieved Knowledge]
+        logger.info("Claude's raw response:\n%s", claude_response)
 
-Please use the retrieved knowledge above to help answer my question, and cite the sources if appropriate.
-"""
-                # Replace the last message with augmented version
-                messages[-1] = ChatMessage(
-                    role="user",
-                    content=augmented_message
-                )
-            else:
-                logger.info(f"No relevant documents found above threshold: {relevance_threshold}")
-                logger.info("Proceeding with regular query without knowledge augmentation")
-        
-        # Call Claude with the custom system prompt
-        claude_response = await claude_service.send_message_with_custom_prompt(
-            messages=messages,
-            system_prompt=system_prompt
-        )
-        
-        logger.info(f"Claude's raw response:\n{claude_response}")
+        # Cache tool-free responses only - tool results are data-dependent
+        if single_turn and '[TOOLS SELECTED]' not in claude_response:
+            await _semantic_cache.put(system_prompt, messages[-1]["content"], claude_response)
         
         # Check if the response contains tool calls
         if '[TOOLS SELECTED]' in claude_response:
@@ -187,33 +423,37 @@ Please use the retrieved knowledge above to help answer my question, and cite th
                 # Store the initial response
                 initial_response = claude_response
                 
-                # Process tool calls
+                # Execute all tool calls concurrently - total wall time is
+                # the slowest call instead of the sum, and ordering in the
+                # results sent back to Claude is preserved by gather
+                raw_results = await asyncio.gather(
+                    *(tools_service._execute_tool_call(tool_call_json)
+                      for tool_call_json, _ in tool_calls),
+                    return_exceptions=True
+                )
+
                 results = []
-                for tool_call_json, tool_call_section in tool_calls:
-                    try:
-                        # Execute the tool call
-                        result = await tools_service._execute_tool_call(tool_call_json)
-                        
+                for (tool_call_json, tool_call_section), result in zip(tool_calls, raw_results):
+                    if isinstance(result, BaseException):
+                        logger.error(f"Error processing tool call: {str(result)}", exc_info=result)
+                        error_message = f"Error: {str(result)}"
+
+                        results.append({
+                            "tool_call": tool_call_json,
+                            "error": str(result),
+                            "formatted": f"[TOOL ERROR: {tool_call_json.get('action', 'unknown').upper()} call to {tool_call_json.get('endpoint', 'unknown')}]\n{error_message}\n[/TOOL ERROR]"
+                        })
+                    else:
                         # Format the result for inclusion
                         action_type = tool_call_json.get("action", "unknown")
                         endpoint = tool_call_json.get("endpoint", "unknown")
-                        formatted_result = json.dumps(result, indent=2)
-                        
+                        formatted_result = orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
+
                         results.append({
                             "tool_call": tool_call_json,
                             "result": result,
                             "formatted": f"[TOOL RESULT: {action_type.upper()} call to {endpoint}]\n{formatted_result}\n[/TOOL RESULT]"
                         })
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing tool call: {str(e)}", exc_info=True)
-                        error_message = f"Error: {str(e)}"
-                        
-                        results.append({
-                            "tool_call": tool_call_json,
-                            "error": str(e),
-                            "formatted": f"[TOOL ERROR: {tool_call_json.get('action', 'unknown').upper()} call to {tool_call_json.get('endpoint', 'unknown')}]\n{error_message}\n[/TOOL ERROR]"
-                        })
                 
                 # Combine the results into a message to send back to Claude
                 tool_results_message = "\n\n".join([r["formatted"] for r in results])
@@ -224,24 +464,28 @@ Based on the tool results above, please provide your final answer to the user's
 Incorporate the data from the API results in your response.
 """
                 
-                # Send the results back to Claude
-                messages.append(ChatMessage(
-                    role="assistant",
-                    content=claude_response
-                ))
-                
-                messages.append(ChatMessage(
-                    role="user",
-                    content=f"{tool_results_message}\n\n{follow_up}"
-                ))
+                # Send the results back to Claude. The assistant turn
+                # carries a cache_control marker so the follow-up call
+                # reuses the prompt cache for the whole shared prefix.
+                messages.append({
+                    "role": "assistant",
+                    "content": [{
+                        "type": "text",
+                        "text": claude_response,
+                        "cache_control": {"type": "ephemeral"}
+                    }]
+                })
+                messages.append({
+                    "role": "user",
+                    "content": f"{tool_results_message}\n\n{follow_up}"
+                })
                 
                 # Get Claude's follow-up response
-                final_response = await claude_service.send_message_with_custom_prompt(
-                    messages=messages,
-                    system_prompt=system_prompt
+                final_response = await _claude_batcher.submit(
+                    claude_service, messages, system_prompt
                 )
                 
-                logger.info(f"Claude's final response with tool results:\n{final_response}")
+                logger.info("Claude's final response with tool results:\n%s", final_response)
                 
                 # Create a combined response showing the process
                 combined_response = f"""
@@ -266,6 +510,127 @@ Based on the information I gathered:
         raise HTTPException(status_code=500, detail=f"Error testing agent: {str(e)}")
 
 
+@router.post("/test-agent/stream")
+async def test_agent_stream(
+    request: TestAgentRequest,
+    claude_service: ClaudeDep,
+    knowledge_service: KnowledgeDep
+):
+    """
+    Test an agent and stream Claude's response via Server-Sent Events.
+
+    - Takes the same request body as /test-agent
+    - Yields text as it arrives from Claude, so the first tokens reach the
+      UI in well under full generation time
+    - Tool-call execution is only performed by the blocking endpoint
+    """
+    messages, system_prompt, _complete_config = await _prepare_agent_call(request, knowledge_service)
+
+    async def event_generator():
+        try:
+            async for chunk in claude_service.send_message_with_custom_prompt_stream(
+                messages=messages,
+                system_prompt=system_prompt
+            ):
+                yield f"data: {json.dumps({'type': 'text', 'content': chunk})}\n\n"
+
+            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+
+        except Exception as e:
+            logger.error(f"Error streaming test-agent response: {str(e)}", exc_info=True)
+            yield f"data: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
+
+
+# Request/response models for batched agent testing
+class TestAgentBatchRequest(BaseModel):
+    requests: List[TestAgentRequest] = Field(..., description="Test-agent requests to run in one batch")
+
+
+class TestAgentBatchSubmitResponse(BaseModel):
+    batch_id: str = Field(..., description="Id of the submitted batch job")
+
+
+class TestAgentBatchStatusResponse(BaseModel):
+    status: str = Field(..., description="Batch processing status")
+    results: Dict[str, Any] = Field(default_factory=dict, description="Per-request results keyed by index, once ended")
+
+
+@router.post("/test-agent-batch", response_model=TestAgentBatchSubmitResponse)
+async def test_agent_batch(
+    batch: TestAgentBatchRequest,
+    claude_service: ClaudeDep,
+    knowledge_service: KnowledgeDep
+):
+    """
+    Run many test-agent requests through the Messages Batches API.
+
+    - Takes a list of the same request bodies as /test-agent
+    - Prepares each prompt (with knowledge augmentation) concurrently and
+      submits them as one batch job at roughly half the per-token cost
+    - Returns a batch id; poll /test-agent-batch/{batch_id} for results
+    - Intended for CI suites and dataset replays, not interactive use
+    """
+    try:
+        prepared = await asyncio.gather(
+            *(_prepare_agent_call(req, knowledge_service) for req in batch.requests)
+        )
+
+        batch_requests = [
+            {
+                "custom_id": str(index),
+                "params": {
+                    "model": claude_service.model,
+                    "max_tokens": 4000,
+                    "messages": messages,
+                    "system": system_prompt
+                }
+            }
+            for index, (messages, system_prompt, _config) in enumerate(prepared)
+        ]
+
+        batch_id = await claude_service.submit_batch(batch_requests)
+        return TestAgentBatchSubmitResponse(batch_id=batch_id)
+
+    except Exception as e:
+        logger.error(f"Error submitting test-agent batch: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error submitting test-agent batch: {str(e)}")
+
+
+@router.get("/test-agent-batch/{batch_id}", response_model=TestAgentBatchStatusResponse)
+async def get_test_agent_batch(batch_id: str, claude_service: ClaudeDep):
+    """
+    Retrieve the status and, once ended, the results of a batch job.
+
+    Args:
+        batch_id: Id returned by /test-agent-batch
+
+    Returns:
+        Batch status, with per-request results keyed by submission index
+        when processing has ended
+    """
+    try:
+        batch = await claude_service.get_batch_status(batch_id)
+        status = batch.get("processing_status", "unknown")
+        if status != "ended":
+            return TestAgentBatchStatusResponse(status=status)
+
+        results = await claude_service.fetch_batch_results(batch["results_url"])
+        return TestAgentBatchStatusResponse(status=status, results=results)
+
+    except Exception as e:
+        logger.error(f"Error retrieving test-agent batch: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error retrieving test-agent batch: {str(e)}")
+
+
 class AgentConfig(BaseModel):
     config: Dict[str, Any] = Field(..., description="Agent configuration")
 
@@ -287,9 +652,9 @@ async def toggle_mode(request: ToggleModeRequest):
         New mode after toggle
     """
     try:
-        logger.info(f"Current mode: {request.current_mode}")
+        logger.info("Current mode: %s", request.current_mode)
         new_mode = "debug" if request.current_mode == "normal" else "normal"
-        logger.info(f"New mode: {new_mode}")
+        logger.info("New mode: %s", new_mode)
         return ToggleModeResponse(new_mode=new_mode)
         
     except Exception as e:
@@ -1,5 +1,10 @@
+import asyncio
+import hashlib
 import httpx
 import json
+import orjson
+import time
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional, Union
 import logging
 
@@ -9,18 +14,100 @@ from app.prompts.system_prompt import get_system_prompt
 
 logger = logging.getLogger(__name__)
 
+# Exact-match response cache bounds - repeated identical (system, messages)
+# tuples are common during agent testing and debug-mode replays
+_RESPONSE_CACHE_SIZE = 1024
+_RESPONSE_CACHE_TTL = 600  # seconds
+
 class ClaudeService:
     """Service for interacting with the Claude API."""
     
     def __init__(self):
         self.api_url = "https://api.anthropic.com/v1/messages"
+        self.batches_url = "https://api.anthropic.com/v1/messages/batches"
         self.api_key = settings.CLAUDE_API_KEY
         self.model = settings.CLAUDE_MODEL
         self.headers = {
             "Content-Type": "application/json",
             "x-api-key": self.api_key,
-            "anthropic-version": "2023-06-01"
+            "anthropic-version": "2023-06-01",
+            # Opt in to prompt caching so repeated system prompts skip prefill
+            "anthropic-beta": "prompt-caching-2024-07-31"
         }
+        # Shared connection pool - TCP+TLS handshakes to the API are paid
+        # once and reused across calls, and HTTP/2 multiplexes concurrent
+        # requests over a single connection
+        self._client = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+        )
+
+        # Exact-match response cache: key -> (expiry timestamp, response text),
+        # in LRU order. Hits skip the network call and the model's entire
+        # prefill/decode at zero API cost.
+        self._response_cache = OrderedDict()
+        self._response_cache_lock = asyncio.Lock()
+
+    async def aclose(self):
+        """Close the pooled HTTP client."""
+        await self._client.aclose()
+
+    def _response_cache_key(self, system_prompt: str, formatted_messages: List[Dict[str, Any]]) -> str:
+        """Content hash identifying one exact (model, system, messages) call."""
+        payload = json.dumps(
+            {"m": self.model, "s": system_prompt, "msgs": formatted_messages},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def _response_cache_get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None if absent/expired."""
+        async with self._response_cache_lock:
+            entry = self._response_cache.get(key)
+            if entry is None:
+                return None
+            expiry, text = entry
+            if expiry < time.monotonic():
+                del self._response_cache[key]
+                return None
+            self._response_cache.move_to_end(key)
+            return text
+
+    async def _response_cache_put(self, key: str, text: str):
+        """Store a response under key, evicting the oldest entry when full."""
+        async with self._response_cache_lock:
+            self._response_cache[key] = (time.monotonic() + _RESPONSE_CACHE_TTL, text)
+            self._response_cache.move_to_end(key)
+            if len(self._response_cache) > _RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+
+    @staticmethod
+    def _cached_system_block(system_prompt: str) -> List[Dict[str, Any]]:
+        """
+        Wrap a system prompt in Anthropic's block form with a cache_control
+        marker, so consecutive calls sharing the prompt (every test-agent
+        turn, and both calls in the tool-call flow) hit the prompt cache
+        instead of re-paying full prefill cost.
+        """
+        return [{
+            "type": "text",
+            "text": system_prompt,
+            "cache_control": {"type": "ephemeral"}
+        }]
+
+    @staticmethod
+    def _log_cache_usage(response_data: Dict[str, Any]):
+        """Log prompt-cache hit statistics when the API reports them."""
+        usage = response_data.get("usage", {})
+        cache_read = usage.get("cache_read_input_tokens")
+        if cache_read is not None:
+            logger.info(
+                "Prompt cache usage: read=%s created=%s input=%s",
+                cache_read,
+                usage.get("cache_creation_input_tokens"),
+                usage.get("input_tokens")
+            )
     
     async def send_message(self, messages: List[ChatMessage], agent_config: Dict[str, Any]) -> str:
         """
@@ -51,34 +138,36 @@ class ClaudeService:
                 "model": self.model,
                 "max_tokens": 4000,
                 "messages": formatted_messages,
-                "system": system_prompt
+                "system": self._cached_system_block(system_prompt)
             }
+
+            # Log the request body only when debugging - serializing it on
+            # every call is wasted work for an INFO-level sink
+            if logger.isEnabledFor(logging.DEBUG):
+                log_body = request_body.copy()
+                log_body["system"] = "..." if system_prompt else ""
+                logger.debug("Request body: %s", orjson.dumps(log_body).decode())
             
-            # Log the request body (but omit the full system prompt to keep logs clean)
-            log_body = request_body.copy()
-            log_body["system"] = "..." if system_prompt else ""
-            logger.info(f"Request body: {json.dumps(log_body)}")
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.api_url,
-                    headers=self.headers,
-                    json=request_body,
-                    timeout=30.0  # 30 second timeout
-                )
-                
-                logger.info(f"Response status: {response.status_code}")
-                
-                # If we got an error response, log as much detail as possible
-                if response.status_code >= 400:
-                    logger.error(f"Error response: {response.text}")
-                    response.raise_for_status()
-                
-                response_data = response.json()
-                logger.info("Successfully received response from Claude")
-                
-                return response_data["content"][0]["text"]
-                
+            response = await self._client.post(
+                self.api_url,
+                headers=self.headers,
+                content=orjson.dumps(request_body),
+                timeout=30.0  # 30 second timeout
+            )
+            
+            logger.info(f"Response status: {response.status_code}")
+            
+            # If we got an error response, log as much detail as possible
+            if response.status_code >= 400:
+                logger.error(f"Error response: {response.text}")
+                response.raise_for_status()
+            
+            response_data = orjson.loads(response.content)
+            logger.info("Successfully received response from Claude")
+            self._log_cache_usage(response_data)
+
+            return response_data["content"][0]["text"]
+
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error occurred: {e}")
             error_detail = "Unknown error"
@@ -90,23 +179,172 @@ class ClaudeService:
                 except:
                     pass
             raise Exception(f"Claude API returned error: {error_detail}")
-            
+
         except httpx.RequestError as e:
             logger.error(f"Request error occurred: {e}")
             raise Exception(f"Error communicating with Claude API: {str(e)}")
-            
+
         except Exception as e:
             logger.error(f"Unexpected error: {e}", exc_info=True)
             raise Exception(f"Unexpected error communicating with Claude API: {str(e)}")
-    
+
+    async def stream_message(self, messages: List[ChatMessage], agent_config: Dict[str, Any]):
+        """
+        Stream a response from the Claude API as text chunks arrive.
+
+        Args:
+            messages: List of previous messages in the conversation
+            agent_config: Current agent configuration
+
+        Yields:
+            Text deltas from Claude's response as they are generated
+        """
+        # Create system prompt with current agent configuration
+        system_prompt = get_system_prompt(agent_config)
+
+        logger.info(f"Streaming request to Claude with {len(messages)} messages")
+
+        # Format messages for Claude API
+        formatted_messages = [
+            {"role": msg.role, "content": msg.content}
+            for msg in messages
+        ]
+
+        # Prepare request body with streaming enabled
+        request_body = {
+            "model": self.model,
+            "max_tokens": 4000,
+            "messages": formatted_messages,
+            "system": self._cached_system_block(system_prompt),
+            "stream": True
+        }
+
+        try:
+            async with self._client.stream(
+                "POST",
+                self.api_url,
+                headers=self.headers,
+                content=orjson.dumps(request_body),
+                timeout=30.0  # 30 second timeout
+            ) as response:
+                logger.info(f"Response status: {response.status_code}")
+
+                if response.status_code >= 400:
+                    error_text = await response.aread()
+                    logger.error(f"Error response: {error_text}")
+                    response.raise_for_status()
+
+                # Parse the SSE stream and yield text deltas as they arrive
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+
+                    event_data = orjson.loads(line[5:].strip())
+                    event_type = event_data.get("type")
+
+                    if event_type == "content_block_delta":
+                        text = event_data.get("delta", {}).get("text")
+                        if text:
+                            yield text
+                    elif event_type == "message_stop":
+                        break
+
+                logger.info("Finished streaming response from Claude")
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error occurred: {e}")
+            raise Exception(f"Claude API returned error: {e.response.status_code}")
+
+        except httpx.RequestError as e:
+            logger.error(f"Request error occurred: {e}")
+            raise Exception(f"Error communicating with Claude API: {str(e)}")
+
+    async def send_message_with_custom_prompt_stream(self, messages: List[Union[ChatMessage, Dict[str, str]]], system_prompt: str):
+        """
+        Stream a response from the Claude API using a custom system prompt.
+
+        Args:
+            messages: List of previous messages in the conversation
+            system_prompt: Custom system prompt to use
+
+        Yields:
+            Text deltas from Claude's response as they are generated
+        """
+        logger.info(f"Streaming request to Claude with custom prompt and {len(messages)} messages")
+
+        # Format messages for Claude API, handling both ChatMessage objects and dictionaries
+        formatted_messages = []
+        for msg in messages:
+            if isinstance(msg, ChatMessage):
+                formatted_messages.append({
+                    "role": msg.role,
+                    "content": msg.content
+                })
+            elif isinstance(msg, dict) and "role" in msg and "content" in msg:
+                formatted_messages.append({
+                    "role": msg["role"],
+                    "content": msg["content"]
+                })
+            else:
+                logger.warning(f"Skipping malformed message: {msg}")
+
+        # Prepare request body with streaming enabled
+        request_body = {
+            "model": self.model,
+            "max_tokens": 4000,
+            "messages": formatted_messages,
+            "system": self._cached_system_block(system_prompt),
+            "stream": True
+        }
+
+        try:
+            async with self._client.stream(
+                "POST",
+                self.api_url,
+                headers=self.headers,
+                content=orjson.dumps(request_body),
+                timeout=30.0  # 30 second timeout
+            ) as response:
+                logger.info(f"Response status: {response.status_code}")
+
+                if response.status_code >= 400:
+                    error_text = await response.aread()
+                    logger.error(f"Error response: {error_text}")
+                    response.raise_for_status()
+
+                # Parse the SSE stream and yield text deltas as they arrive
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+
+                    event_data = orjson.loads(line[5:].strip())
+                    event_type = event_data.get("type")
+
+                    if event_type == "content_block_delta":
+                        text = event_data.get("delta", {}).get("text")
+                        if text:
+                            yield text
+                    elif event_type == "message_stop":
+                        break
+
+                logger.info("Finished streaming response from Claude")
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error occurred: {e}")
+            raise Exception(f"Claude API returned error: {e.response.status_code}")
+
+        except httpx.RequestError as e:
+            logger.error(f"Request error occurred: {e}")
+            raise Exception(f"Error communicating with Claude API: {str(e)}")
+
     async def send_message_with_custom_prompt(self, messages: List[Union[ChatMessage, Dict[str, str]]], system_prompt: str) -> str:
         """
         Send messages to Claude API with a custom system prompt.
-        
+
         Args:
             messages: List of previous messages in the conversation
             system_prompt: Custom system prompt to use
-            
+
         Returns:
             Claude's response text
         """
@@ -129,40 +367,55 @@ class ClaudeService:
                     })
                 else:
                     logger.warning(f"Skipping malformed message: {msg}")
-            
+
+            # Identical (system, conversation) tuples short-circuit to the
+            # cached response instead of hitting the API again
+            cache_key = None
+            try:
+                cache_key = self._response_cache_key(system_prompt, formatted_messages)
+            except TypeError:
+                pass
+            if cache_key is not None:
+                cached_text = await self._response_cache_get(cache_key)
+                if cached_text is not None:
+                    logger.info("Response cache hit, skipping Claude API call")
+                    return cached_text
+
             # Prepare request body
             request_body = {
                 "model": self.model,
                 "max_tokens": 4000,
                 "messages": formatted_messages,
-                "system": system_prompt
+                "system": self._cached_system_block(system_prompt)
             }
             
             # Log the full system prompt for debugging
-            logger.info("Using custom system prompt:")
-            for line in system_prompt.split('\n'):
-                logger.info(f"  {line}")
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.api_url,
-                    headers=self.headers,
-                    json=request_body,
-                    timeout=30.0  # 30 second timeout
-                )
-                
-                logger.info(f"Response status: {response.status_code}")
-                
-                # If we got an error response, log as much detail as possible
-                if response.status_code >= 400:
-                    logger.error(f"Error response: {response.text}")
-                    response.raise_for_status()
-                
-                response_data = response.json()
-                logger.info("Successfully received response from Claude")
-                
-                return response_data["content"][0]["text"]
-                
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Using custom system prompt:\n%s", system_prompt)
+            
+            response = await self._client.post(
+                self.api_url,
+                headers=self.headers,
+                content=orjson.dumps(request_body),
+                timeout=30.0  # 30 second timeout
+            )
+            
+            logger.info(f"Response status: {response.status_code}")
+            
+            # If we got an error response, log as much detail as possible
+            if response.status_code >= 400:
+                logger.error(f"Error response: {response.text}")
+                response.raise_for_status()
+            
+            response_data = orjson.loads(response.content)
+            logger.info("Successfully received response from Claude")
+            self._log_cache_usage(response_data)
+
+            response_text = response_data["content"][0]["text"]
+            if cache_key is not None:
+                await self._response_cache_put(cache_key, response_text)
+            return response_text
+
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error occurred: {e}")
             error_detail = "Unknown error"
@@ -183,6 +436,220 @@ class ClaudeService:
             logger.error(f"Unexpected error: {e}", exc_info=True)
             raise Exception(f"Unexpected error communicating with Claude API: {str(e)}")
     
+    async def send_message_with_tools(self, messages: List[Union[ChatMessage, Dict[str, Any]]], system_prompt: str, tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Send messages with native tool definitions and return the full response.
+
+        Tool invocations come back as structured tool_use content blocks with
+        stop_reason "tool_use"; the caller executes them and continues the
+        same conversation with tool_result blocks, so the cached system
+        prefix is reused instead of re-sending formatted results as prose.
+        Responses are never served from the exact-match cache on this path -
+        tool results are data-dependent.
+
+        Args:
+            messages: List of previous messages in the conversation
+            system_prompt: Custom system prompt to use
+            tools: Native tool definitions for the request body
+
+        Returns:
+            The parsed API response (content blocks, stop_reason, usage)
+        """
+        try:
+            logger.info(f"Sending tool-enabled request to Claude with {len(messages)} messages and {len(tools)} tools")
+
+            # Format messages for Claude API, handling both ChatMessage objects and dictionaries
+            formatted_messages = []
+            for msg in messages:
+                if isinstance(msg, ChatMessage):
+                    formatted_messages.append({
+                        "role": msg.role,
+                        "content": msg.content
+                    })
+                elif isinstance(msg, dict) and "role" in msg and "content" in msg:
+                    formatted_messages.append({
+                        "role": msg["role"],
+                        "content": msg["content"]
+                    })
+                else:
+                    logger.warning(f"Skipping malformed message: {msg}")
+
+            # Prepare request body
+            request_body = {
+                "model": self.model,
+                "max_tokens": 4000,
+                "messages": formatted_messages,
+                "system": self._cached_system_block(system_prompt),
+                "tools": tools
+            }
+
+            response = await self._client.post(
+                self.api_url,
+                headers=self.headers,
+                content=orjson.dumps(request_body),
+                timeout=30.0  # 30 second timeout
+            )
+
+            logger.info(f"Response status: {response.status_code}")
+
+            # If we got an error response, log as much detail as possible
+            if response.status_code >= 400:
+                logger.error(f"Error response: {response.text}")
+                response.raise_for_status()
+
+            response_data = orjson.loads(response.content)
+            logger.info("Successfully received response from Claude (stop_reason=%s)", response_data.get("stop_reason"))
+            self._log_cache_usage(response_data)
+
+            return response_data
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error occurred: {e}")
+            error_detail = "Unknown error"
+            try:
+                error_detail = e.response.json().get("error", {}).get("message", "Unknown error")
+            except:
+                try:
+                    error_detail = e.response.text
+                except:
+                    pass
+            raise Exception(f"Claude API returned error: {error_detail}")
+
+        except httpx.RequestError as e:
+            logger.error(f"Request error occurred: {e}")
+            raise Exception(f"Error communicating with Claude API: {str(e)}")
+
+        except Exception as e:
+            logger.error(f"Unexpected error: {e}", exc_info=True)
+            raise Exception(f"Unexpected error communicating with Claude API: {str(e)}")
+
+    async def submit_batch(self, batch_requests: List[Dict[str, Any]]) -> str:
+        """
+        Submit message requests to the Messages Batches API.
+
+        Batched requests process asynchronously at roughly half the
+        per-token cost and with higher rate limits, which suits bulk
+        regression runs where interactive latency does not matter.
+
+        Args:
+            batch_requests: List of {"custom_id": ..., "params": ...} entries,
+                where params is a regular Messages API request body
+
+        Returns:
+            The batch id to poll with get_batch_status / wait_for_batch
+        """
+        try:
+            logger.info(f"Submitting batch with {len(batch_requests)} requests")
+
+            response = await self._client.post(
+                self.batches_url,
+                headers=self.headers,
+                content=orjson.dumps({"requests": batch_requests}),
+                timeout=30.0
+            )
+
+            if response.status_code >= 400:
+                logger.error(f"Error response: {response.text}")
+                response.raise_for_status()
+
+            batch_data = orjson.loads(response.content)
+            logger.info("Batch %s submitted (status=%s)", batch_data.get("id"), batch_data.get("processing_status"))
+            return batch_data["id"]
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error occurred: {e}")
+            raise Exception(f"Claude API returned error: {e.response.status_code}")
+
+        except httpx.RequestError as e:
+            logger.error(f"Request error occurred: {e}")
+            raise Exception(f"Error communicating with Claude API: {str(e)}")
+
+    async def get_batch_status(self, batch_id: str) -> Dict[str, Any]:
+        """
+        Fetch the current state of a batch job.
+
+        Args:
+            batch_id: Id returned by submit_batch
+
+        Returns:
+            The batch object, including processing_status and results_url
+        """
+        try:
+            response = await self._client.get(
+                f"{self.batches_url}/{batch_id}",
+                headers=self.headers,
+                timeout=30.0
+            )
+
+            if response.status_code >= 400:
+                logger.error(f"Error response: {response.text}")
+                response.raise_for_status()
+
+            return orjson.loads(response.content)
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error occurred: {e}")
+            raise Exception(f"Claude API returned error: {e.response.status_code}")
+
+        except httpx.RequestError as e:
+            logger.error(f"Request error occurred: {e}")
+            raise Exception(f"Error communicating with Claude API: {str(e)}")
+
+    async def fetch_batch_results(self, results_url: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Download and parse the results of an ended batch.
+
+        Args:
+            results_url: The results_url reported for an ended batch
+
+        Returns:
+            Mapping of custom_id to the per-request result object
+        """
+        try:
+            response = await self._client.get(results_url, headers=self.headers, timeout=60.0)
+
+            if response.status_code >= 400:
+                logger.error(f"Error response: {response.text}")
+                response.raise_for_status()
+
+            # Results arrive as one JSON object per line
+            results = {}
+            for line in response.content.splitlines():
+                if not line.strip():
+                    continue
+                entry = orjson.loads(line)
+                results[entry["custom_id"]] = entry["result"]
+            return results
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error occurred: {e}")
+            raise Exception(f"Claude API returned error: {e.response.status_code}")
+
+        except httpx.RequestError as e:
+            logger.error(f"Request error occurred: {e}")
+            raise Exception(f"Error communicating with Claude API: {str(e)}")
+
+    async def wait_for_batch(self, batch_id: str, poll_interval: float = 5.0, timeout: float = 600.0) -> Dict[str, Dict[str, Any]]:
+        """
+        Poll a batch until it ends and return its parsed results.
+
+        Args:
+            batch_id: Id returned by submit_batch
+            poll_interval: Seconds between status polls
+            timeout: Maximum seconds to wait before giving up
+
+        Returns:
+            Mapping of custom_id to the per-request result object
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            batch = await self.get_batch_status(batch_id)
+            if batch.get("processing_status") == "ended":
+                return await self.fetch_batch_results(batch["results_url"])
+            if time.monotonic() >= deadline:
+                raise Exception(f"Batch {batch_id} did not finish within {timeout}s")
+            await asyncio.sleep(poll_interval)
+
     async def process_message(self, messages: List[ChatMessage], agent_config: Dict[str, Any]) -> str:
         """
         Process a message with Claude API and get a response.
@@ -1,29 +1,153 @@
+import asyncio
+import hashlib
 import os
 import tempfile
+import time
 import shutil
 import logging
 import json
+import orjson
+from collections import OrderedDict
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 import uuid
-from fastapi import UploadFile
+import aiofiles
+import httpx
+from fastapi import HTTPException, UploadFile
 import traceback
 
 # Import Llama Index components
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, StorageContext, load_index_from_storage
+from llama_index.core import Settings, SimpleDirectoryReader, VectorStoreIndex, StorageContext, load_index_from_storage
 from llama_index.core.retrievers import VectorIndexRetriever
 from llama_index.core.query_engine import RetrieverQueryEngine
 from llama_index.indices.managed.llama_cloud import LlamaCloudIndex
 from llama_index.core.node_parser import SentenceSplitter
 
+# faiss provides a graph-based ANN (HNSW) store so local retrieval stays
+# log-time as document counts grow; without it llama-index's default flat
+# store brute-forces cosine similarity over every node per query
+try:
+    import faiss
+    from llama_index.vector_stores.faiss import FaissVectorStore
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
 from app.config.settings import settings
+from app.services.llama_cpp_embedding import LlamaCppEmbedding
+from app.services.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+# HNSW graph connectivity - higher trades build time and memory for recall
+_HNSW_M = 32
+
+# Chunks per embedding request during index builds - large batches amortize
+# the backend's per-request overhead instead of paying one HTTP round-trip
+# per chunk
+_EMBED_BATCH_SIZE = 128
+
+# Entries kept in the exact-match knowledge-query cache
+_EXACT_CACHE_SIZE = 256
+
+
+def _build_vector_index(documents) -> VectorStoreIndex:
+    """
+    Build a vector index over documents, backed by a faiss HNSW store when
+    the extension is installed and by the default flat store otherwise.
+
+    Args:
+        documents: Documents loaded for indexing
+
+    Returns:
+        The constructed VectorStoreIndex
+    """
+    # Make sure the document embedding pass runs batched - the llama-index
+    # defaults are conservative and leave throughput on serial round-trips
+    embed_model = Settings.embed_model
+    if getattr(embed_model, "embed_batch_size", None) and embed_model.embed_batch_size < _EMBED_BATCH_SIZE:
+        embed_model.embed_batch_size = _EMBED_BATCH_SIZE
+
+    if FAISS_AVAILABLE:
+        # Probe the embedding model once for its dimensionality - one tiny
+        # embedding call next to the full document embedding pass
+        embed_dim = len(Settings.embed_model.get_text_embedding("dimension probe"))
+        # Inner product over unit-norm embeddings is cosine similarity, so
+        # retrieval scores land in the 0-1 range the relevance threshold
+        # expects; the faiss default (L2) surfaces raw distances where small
+        # means close, which inverts the threshold gate downstream
+        vector_store = FaissVectorStore(
+            faiss_index=faiss.IndexHNSWFlat(embed_dim, _HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        )
+        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+        return VectorStoreIndex.from_documents(documents, storage_context=storage_context)
+
+    return VectorStoreIndex.from_documents(documents)
+
+
+def _load_storage_context(persist_dir: str) -> StorageContext:
+    """
+    Load a persisted storage context, restoring the faiss vector store for
+    indexes that were built with one.
+
+    Args:
+        persist_dir: Directory the index was persisted to
+
+    Returns:
+        The loaded StorageContext
+    """
+    if FAISS_AVAILABLE:
+        try:
+            vector_store = FaissVectorStore.from_persist_dir(persist_dir)
+            return StorageContext.from_defaults(vector_store=vector_store, persist_dir=persist_dir)
+        except Exception:
+            # Index predates the faiss store - fall back to the default load
+            logger.debug(f"No faiss store found in {persist_dir}, using default vector store")
+
+    return StorageContext.from_defaults(persist_dir=persist_dir)
+
+def _list_document_files(directory: str) -> List[str]:
+    """
+    Names of the regular files in directory, excluding the metadata file.
+
+    One scandir pass reuses each DirEntry's cached stat result instead of
+    paying a separate isfile() stat call per listdir entry.
+
+    Args:
+        directory: Directory to enumerate
+
+    Returns:
+        File names, in directory order
+    """
+    with os.scandir(directory) as entries:
+        return [entry.name for entry in entries if entry.is_file() and entry.name != "metadata.json"]
+
+
+def _load_documents(directory: str):
+    """
+    Load the documents in directory for indexing.
+
+    The explicit file list keeps the reader off the metadata file and off
+    a second directory walk. Blocking I/O - callers run this in a worker
+    thread.
+
+    Args:
+        directory: Directory containing the uploaded documents
+
+    Returns:
+        Loaded documents
+    """
+    files = [os.path.join(directory, name) for name in _list_document_files(directory)]
+    return SimpleDirectoryReader(input_files=files).load_data()
+
+
+@lru_cache(maxsize=256)
 def sanitize_agent_name(name: str) -> str:
     """
     Sanitize agent name for use in index name and directory names.
     Public utility function that can be imported by other modules.
-    
+    Memoized - it runs on every query for the same handful of names.
+
     Args:
         name: Original agent name
         
@@ -62,7 +186,120 @@ class KnowledgeService:
         # Create directories if they don't exist
         os.makedirs(self.temp_upload_dir, exist_ok=True)
         os.makedirs(self.permanent_storage_dir, exist_ok=True)
-        
+
+        # Prefer GPU-served embeddings when a llama.cpp server is
+        # reachable - indexing is embedding-compute-bound and the server
+        # batches far better than in-process CPU models. One cheap probe
+        # decides; otherwise the configured default model stays in place.
+        embed_model = LlamaCppEmbedding(
+            base_url=settings.LLAMA_EMBED_URL,
+            embed_batch_size=_EMBED_BATCH_SIZE
+        )
+        if embed_model.probe():
+            Settings.embed_model = embed_model
+            logger.info(f"Using llama.cpp embeddings at {settings.LLAMA_EMBED_URL} ({embed_model.dimensions} dims)")
+        else:
+            logger.info(f"No llama.cpp embedding server at {settings.LLAMA_EMBED_URL}, keeping default embed model")
+
+        # Loaded index objects, so popular agents don't redo the full
+        # deserialize-from-disk (or LlamaCloud handle setup) on every query.
+        # Local entries are keyed by persist dir and invalidated by mtime;
+        # cloud entries are keyed by (index name, project). Per-key locks
+        # prevent thundering-herd rebuilds under concurrent queries.
+        self._local_index_cache: Dict[str, tuple] = {}
+        self._cloud_index_cache: Dict[tuple, LlamaCloudIndex] = {}
+        self._index_locks: Dict[Any, asyncio.Lock] = {}
+
+        # Shared HTTP clients injected into LlamaCloud handles - TCP+TLS
+        # handshakes to the API are paid once and kept alive, and HTTP/2
+        # multiplexes concurrent queries over a single connection
+        pool_limits = httpx.Limits(max_keepalive_connections=16, max_connections=32)
+        pool_timeout = httpx.Timeout(60.0, connect=10.0)
+        self._cloud_http_client = httpx.Client(limits=pool_limits, timeout=pool_timeout, http2=True)
+        self._cloud_async_http_client = httpx.AsyncClient(limits=pool_limits, timeout=pool_timeout, http2=True)
+
+        # Paraphrased repeats of the same knowledge query skip retrieval
+        # and synthesis entirely - the formatted context is served back by
+        # embedding similarity (threshold and TTL come from settings)
+        self._semantic_cache = SemanticCache()
+
+        # Tier-0 exact-match LRU in front of the semantic tier - identical
+        # repeat queries (retries, multi-turn references) skip even the
+        # embedding call. Entries share the semantic cache's TTL.
+        self._exact_cache: OrderedDict = OrderedDict()
+
+        # Parsed metadata.json contents keyed by path, invalidated by file
+        # mtime - the query paths re-read these on every request otherwise.
+        # Writers keep going straight to disk; the next read picks up the
+        # new mtime.
+        self._metadata_cache: Dict[str, tuple] = {}
+
+    def _read_metadata(self, metadata_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the parsed metadata for a path, re-reading only when the
+        file changes on disk.
+
+        Args:
+            metadata_path: Path to a metadata.json file
+
+        Returns:
+            The parsed metadata, or None when the file does not exist
+        """
+        try:
+            stat = os.stat(metadata_path)
+        except FileNotFoundError:
+            self._metadata_cache.pop(metadata_path, None)
+            return None
+
+        entry = self._metadata_cache.get(metadata_path)
+        if entry is not None and entry[0] == stat.st_mtime_ns:
+            return entry[1]
+
+        # orjson parses the raw bytes in C - metadata files carrying index
+        # manifests can run to hundreds of KB
+        with open(metadata_path, 'rb') as f:
+            metadata = orjson.loads(f.read())
+        self._metadata_cache[metadata_path] = (stat.st_mtime_ns, metadata)
+        return metadata
+
+    async def _get_local_index(self, index_path: str) -> VectorStoreIndex:
+        """
+        Return the loaded index for a persist dir, reloading only when the
+        directory's mtime changes.
+        """
+        mtime = os.path.getmtime(index_path)
+        entry = self._local_index_cache.get(index_path)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+
+        lock = self._index_locks.setdefault(index_path, asyncio.Lock())
+        async with lock:
+            entry = self._local_index_cache.get(index_path)
+            if entry is not None and entry[0] == mtime:
+                return entry[1]
+
+            # Deserializing the persisted index is blocking I/O plus CPU -
+            # run it in a worker thread so the event loop stays responsive
+            storage_context = await asyncio.to_thread(_load_storage_context, index_path)
+            index = await asyncio.to_thread(load_index_from_storage, storage_context)
+            self._local_index_cache[index_path] = (mtime, index)
+            return index
+
+    def _get_cloud_index(self, index_name: str, project_name: str) -> LlamaCloudIndex:
+        """Return a shared LlamaCloudIndex handle for (index, project)."""
+        key = (index_name, project_name)
+        index = self._cloud_index_cache.get(key)
+        if index is None:
+            index = LlamaCloudIndex(
+                index_name=index_name,
+                project_name=project_name,
+                api_key=self.llama_cloud_api_key,
+                httpx_client=self._cloud_http_client,
+                async_httpx_client=self._cloud_async_http_client
+            )
+            self._cloud_index_cache[key] = index
+        return index
+
     async def upload_file(self, file: UploadFile, agent_name: str) -> Dict[str, Any]:
         """
         Upload a single file to temporary storage.
@@ -79,12 +316,9 @@ class KnowledgeService:
             agent_dir = os.path.join(self.temp_upload_dir, sanitize_agent_name(agent_name))
             os.makedirs(agent_dir, exist_ok=True)
             
-            # Get the file content
-            file_content = await file.read()
-            
             # Create the file path
             file_path = os.path.join(agent_dir, file.filename)
-            
+
             # Check if file already exists
             if os.path.exists(file_path):
                 # Add timestamp to make filename unique
@@ -93,10 +327,20 @@ class KnowledgeService:
                 file_path = os.path.join(agent_dir, new_filename)
             else:
                 new_filename = file.filename
-            
-            # Write the content to the file
-            with open(file_path, "wb") as f:
-                f.write(file_content)
+
+            # Stream the upload to disk in 1 MB chunks so large files never
+            # need to be buffered fully in memory. The byte counter enforces
+            # the size cap even when the Content-Length header is wrong.
+            bytes_written = 0
+            async with aiofiles.open(file_path, "wb") as f:
+                while chunk := await file.read(1 << 20):
+                    bytes_written += len(chunk)
+                    if bytes_written > settings.MAX_UPLOAD_SIZE:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"Upload exceeds maximum size of {settings.MAX_UPLOAD_SIZE} bytes"
+                        )
+                    await f.write(chunk)
                 
             logger.info(f"Saved file {new_filename} for agent {agent_name}")
             
@@ -108,7 +352,13 @@ class KnowledgeService:
                 "file_name": new_filename,
                 "agent_name": agent_name
             }
-                
+
+        except HTTPException:
+            # Size cap exceeded - drop the partial file and let the router
+            # surface the 413
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
         except Exception as e:
             logger.error(f"Error uploading file: {str(e)}", exc_info=True)
             return {
@@ -191,7 +441,7 @@ class KnowledgeService:
                 }
             else:
                 # No metadata file, get files from directory
-                files = [f for f in os.listdir(agent_dir) if os.path.isfile(os.path.join(agent_dir, f)) and f != "metadata.json"]
+                files = _list_document_files(agent_dir)
                 
                 return {
                     "agent_name": agent_name,
@@ -314,7 +564,7 @@ class KnowledgeService:
                     }
             else:
                 # No metadata file, get files from directory
-                files = [f for f in os.listdir(agent_dir) if os.path.isfile(os.path.join(agent_dir, f)) and f != "metadata.json"]
+                files = _list_document_files(agent_dir)
                 
                 if not files:
                     return {
@@ -340,8 +590,9 @@ class KnowledgeService:
             
             logger.info(f"Creating LlamaCloud index: {index_info} with {len(metadata['files'])} documents")
             
-            # Load documents from the directory
-            documents = SimpleDirectoryReader(agent_dir, recursive=False).load_data()
+            # Load documents from the directory - blocking file I/O runs in
+            # a worker thread so the event loop stays responsive
+            documents = await asyncio.to_thread(_load_documents, agent_dir)
             logger.info(f"Loaded {len(documents)} documents")
             
             # Create the index and upload documents
@@ -437,12 +688,13 @@ class KnowledgeService:
                 # Create LlamaIndex index from the documents
                 logger.info(f"Creating local index for agent {agent_name}")
                 
-                # Load documents from the permanent directory
-                documents = SimpleDirectoryReader(local_path, recursive=False).load_data()
+                # Load documents from the permanent directory - blocking file
+                # I/O runs in a worker thread so the event loop stays responsive
+                documents = await asyncio.to_thread(_load_documents, local_path)
                 logger.info(f"Loaded {len(documents)} documents for indexing")
                 
                 # Create the index 
-                index = VectorStoreIndex.from_documents(documents)
+                index = _build_vector_index(documents)
                 
                 # Persist the index to disk
                 index.storage_context.persist(persist_dir=index_path)
@@ -476,7 +728,7 @@ class KnowledgeService:
                 }
             else:
                 # No metadata file, get files from directory
-                files = [f for f in os.listdir(temp_agent_dir) if os.path.isfile(os.path.join(temp_agent_dir, f)) and f != "metadata.json"]
+                files = _list_document_files(temp_agent_dir)
                 
                 if not files:
                     return {
@@ -496,12 +748,13 @@ class KnowledgeService:
                 # Create LlamaIndex index from the documents
                 logger.info(f"Creating local index for agent {agent_name}")
                 
-                # Load documents from the permanent directory
-                documents = SimpleDirectoryReader(local_path, recursive=False).load_data()
+                # Load documents from the permanent directory - blocking file
+                # I/O runs in a worker thread so the event loop stays responsive
+                documents = await asyncio.to_thread(_load_documents, local_path)
                 logger.info(f"Loaded {len(documents)} documents for indexing")
                 
                 # Create the index
-                index = VectorStoreIndex.from_documents(documents)
+                index = _build_vector_index(documents)
                 
                 # Persist the index to disk
                 index.storage_context.persist(persist_dir=index_path)
@@ -553,35 +806,48 @@ class KnowledgeService:
     # Query Methods
     #
 
-    async def query_local_index(self, agent_name: str, index_info: str, query_text: str, similarity_top_k: int = 3) -> Dict[str, Any]:
+    async def query_local_index(self, agent_name: str, index_info: str, query_text: str, similarity_top_k: int = 3, retrieve_only: bool = False) -> Dict[str, Any]:
         """
         Query the local index for an agent.
-        
+
         Args:
             agent_name: Name of the agent
             query_text: The query to search for
             similarity_top_k: Number of top similar results to return
-            
+            retrieve_only: Skip LLM synthesis and return the raw top-k chunks
+
         Returns:
             Dictionary with query results including relevant text snippets
         """
         try:
-            storage_context = StorageContext.from_defaults(persist_dir=index_info)
-            index = load_index_from_storage(storage_context)
-            
-            # Create query engine
-            query_engine = index.as_query_engine(similarity_top_k=similarity_top_k)
-            
+            index = await self._get_local_index(index_info)
+
             # Execute query
             logger.info(f"Executing query for agent {agent_name}: {query_text}")
-            response = query_engine.query(query_text)
-            
+
+            if retrieve_only:
+                # The caller synthesizes its own answer from the chunks, so
+                # skip the response-synthesis LLM round-trip entirely
+                retriever = index.as_retriever(similarity_top_k=similarity_top_k)
+                source_nodes = await retriever.aretrieve(query_text)
+                response_text = "\n\n".join(node.get_content() for node in source_nodes)
+                response = None
+            else:
+                # Create query engine
+                query_engine = index.as_query_engine(similarity_top_k=similarity_top_k)
+
+                # aquery keeps the event loop free for other requests while
+                # the retrieval and synthesis run
+                response = await query_engine.aquery(query_text)
+                source_nodes = getattr(response, 'source_nodes', [])
+                response_text = str(response)
+
             # Extract source nodes for context
             source_texts = []
             source_documents = []
-            
-            if hasattr(response, 'source_nodes'):
-                for node in response.source_nodes:
+
+            if source_nodes:
+                for node in source_nodes:
                     source_texts.append(node.text)
                     if hasattr(node, 'metadata') and node.metadata:
                         source_doc = {
@@ -595,12 +861,12 @@ class KnowledgeService:
                 "success": True,
                 "agent_name": agent_name,
                 "query": query_text,
-                "response": str(response),
+                "response": response_text,
                 "source_texts": source_texts,
                 "source_documents": source_documents,
                 "raw_response_object": response
             }
-            
+
         except Exception as e:
             logger.error(f"Error querying local index: {str(e)}", exc_info=True)
             return {
@@ -608,15 +874,49 @@ class KnowledgeService:
                 "error": str(e)
             }
 
-    async def query_llama_cloud_index(self, agent_name: str, query_text: str, similarity_top_k: int = 3) -> Dict[str, Any]:
+    async def stream_local_query(self, agent_name: str, index_info: str, query_text: str, similarity_top_k: int = 3):
+        """
+        Stream the synthesized answer for a local-index query.
+
+        Yields text chunks as the synthesis LLM produces them, so callers
+        can start forwarding tokens well before the full answer exists
+        instead of blocking on the complete Response.
+
+        Args:
+            agent_name: Name of the agent
+            index_info: Persist directory of the local index
+            query_text: The query to search for
+            similarity_top_k: Number of top similar results to use
+
+        Yields:
+            Text chunks of the synthesized answer
+        """
+        index = await self._get_local_index(index_info)
+        query_engine = index.as_query_engine(similarity_top_k=similarity_top_k, streaming=True)
+
+        logger.info(f"Streaming query for agent {agent_name}: {query_text}")
+
+        # The streaming query returns once retrieval finishes; synthesis
+        # chunks then arrive through a blocking generator, so both steps
+        # run in worker threads to keep the event loop free
+        response = await asyncio.to_thread(query_engine.query, query_text)
+        chunks = response.response_gen
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+
+    async def query_llama_cloud_index(self, agent_name: str, query_text: str, similarity_top_k: int = 3, retrieve_only: bool = False) -> Dict[str, Any]:
         """
         Query the LlamaCloud index for an agent.
-        
+
         Args:
             agent_name: Name of the agent
             query_text: The query to search for
             similarity_top_k: Number of top similar results to return
-            
+            retrieve_only: Skip LLM synthesis and return the raw top-k chunks
+
         Returns:
             Dictionary with query results including relevant text snippets
         """
@@ -632,16 +932,14 @@ class KnowledgeService:
             
             # Get metadata
             metadata_path = os.path.join(temp_agent_dir, "metadata.json")
-            
-            if not os.path.exists(metadata_path):
+
+            metadata = self._read_metadata(metadata_path)
+            if metadata is None:
                 return {
                     "success": False,
                     "error": f"No metadata found for agent {agent_name}"
                 }
-                
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
-            
+
             # Check if index exists
             index_info = metadata.get("index_info") or metadata.get("index_name")
             if not index_info:
@@ -653,28 +951,38 @@ class KnowledgeService:
             # Load the index from LlamaCloud
             logger.info(f"Loading LlamaCloud index for agent {agent_name}: {index_info}")
             
-            # Access the index from LlamaCloud
-            index = LlamaCloudIndex(
-                index_name=index_info,
-                project_name=metadata.get("project_name", self.project_name),
-                api_key=self.llama_cloud_api_key
-            )
-            
-            # Create query engine
-            query_engine = index.as_query_engine(
-                similarity_top_k=similarity_top_k
+            # Access the index from LlamaCloud via the shared handle cache
+            index = self._get_cloud_index(
+                index_info,
+                metadata.get("project_name", self.project_name)
             )
             
             # Execute query
             logger.info(f"Executing query for agent {agent_name} on LlamaCloud index: {query_text}")
-            response = query_engine.query(query_text)
-            
+
+            if retrieve_only:
+                # The caller synthesizes its own answer from the chunks, so
+                # skip the response-synthesis LLM round-trip entirely
+                retriever = index.as_retriever(similarity_top_k=similarity_top_k)
+                source_nodes = await retriever.aretrieve(query_text)
+                response_text = "\n\n".join(node.get_content() for node in source_nodes)
+                response = None
+            else:
+                # Create query engine
+                query_engine = index.as_query_engine(
+                    similarity_top_k=similarity_top_k
+                )
+
+                response = await query_engine.aquery(query_text)
+                source_nodes = getattr(response, 'source_nodes', [])
+                response_text = str(response)
+
             # Extract source nodes for context
             source_texts = []
             source_documents = []
-            
-            if hasattr(response, 'source_nodes'):
-                for node in response.source_nodes:
+
+            if source_nodes:
+                for node in source_nodes:
                     source_texts.append(node.text)
                     if hasattr(node, 'metadata') and node.metadata:
                         source_doc = {
@@ -688,12 +996,12 @@ class KnowledgeService:
                 "success": True,
                 "agent_name": agent_name,
                 "query": query_text,
-                "response": str(response),
+                "response": response_text,
                 "source_texts": source_texts,
                 "source_documents": source_documents,
                 "raw_response_object": response
             }
-            
+
         except Exception as e:
             logger.error(f"Error querying LlamaCloud index: {str(e)}", exc_info=True)
             return {
@@ -701,7 +1009,7 @@ class KnowledgeService:
                 "error": str(e)
             }
 
-    async def query_agent_knowledge(self, agent_name: str, index_info: str, storage_type: str, query_text: str, similarity_top_k: int = 3) -> Dict[str, Any]:
+    async def query_agent_knowledge(self, agent_name: str, index_info: str, storage_type: str, query_text: str, similarity_top_k: int = 3, retrieve_only: bool = False) -> Dict[str, Any]:
         """
         Query the appropriate index for an agent based on what's available.
         This method will automatically determine whether to use a local index or LlamaCloud index.
@@ -710,45 +1018,111 @@ class KnowledgeService:
             agent_name: Name of the agent
             query_text: The query to search for
             similarity_top_k: Number of top similar results to return
-            
+            retrieve_only: Skip LLM synthesis and return the raw top-k chunks
+
         Returns:
             Dictionary with query results
         """
         try:
             sanitized_name = sanitize_agent_name(agent_name)
-            
-            # First check permanent storage for metadata
+
+            # Collect every configured source and fire them concurrently -
+            # an agent with both a local and a LlamaCloud index waits for
+            # the slower of the two instead of the sum
+            tasks = []
+
+            # First check permanent storage for a local index
             perm_agent_dir = os.path.join(self.permanent_storage_dir, sanitized_name)
             perm_metadata_path = os.path.join(perm_agent_dir, "metadata.json")
-            
-            # If permanent storage exists with an index, use that first
+
             if storage_type == "local" and index_info and os.path.exists(perm_metadata_path):
-                return await self.query_local_index(agent_name, index_info, query_text, similarity_top_k)
-            
-            else: # Otherwise check for a LlamaCloud index
-                temp_agent_dir = os.path.join(self.temp_upload_dir, sanitized_name)
-                temp_metadata_path = os.path.join(temp_agent_dir, "metadata.json")
-                
-                if os.path.exists(temp_metadata_path):
-                    with open(temp_metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                        
-                    if metadata.get("index_info"):
-                        # Use LlamaCloud index
-                        return await self.query_llama_cloud_index(agent_name, query_text, similarity_top_k)
-            
-            # No index found
-            return {
-                "success": False,
-                "error": f"No index found for agent {agent_name}, please create an index first"
-            }
-            
+                tasks.append(self.query_local_index(agent_name, index_info, query_text, similarity_top_k, retrieve_only))
+
+            # Then check for a LlamaCloud index
+            temp_agent_dir = os.path.join(self.temp_upload_dir, sanitized_name)
+            temp_metadata_path = os.path.join(temp_agent_dir, "metadata.json")
+
+            metadata = self._read_metadata(temp_metadata_path)
+            if metadata is not None:
+                # Local metadata stores the index path under index_info too,
+                # so only a non-local entry identifies a LlamaCloud index
+                if metadata.get("index_info") and metadata.get("storage_type") != "local":
+                    tasks.append(self.query_llama_cloud_index(agent_name, query_text, similarity_top_k, retrieve_only))
+
+            if not tasks:
+                # No index found
+                return {
+                    "success": False,
+                    "error": f"No index found for agent {agent_name}, please create an index first"
+                }
+
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+            successes = []
+            for result in results:
+                if isinstance(result, BaseException):
+                    logger.error(f"Error querying index: {str(result)}", exc_info=result)
+                elif result.get("success", False):
+                    successes.append(result)
+
+            if not successes:
+                # Surface the first structured failure, or a generic error
+                # when everything raised
+                for result in results:
+                    if not isinstance(result, BaseException):
+                        return result
+                return {
+                    "success": False,
+                    "error": str(results[0])
+                }
+
+            if len(successes) == 1:
+                return successes[0]
+
+            return self._merge_query_results(successes)
+
         except Exception as e:
             logger.error(f"Error querying agent knowledge: {str(e)}", exc_info=True)
             return {
                 "success": False,
                 "error": str(e)
             }
+
+    def _merge_query_results(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merge successful per-index query results into a single result.
+
+        Response texts are concatenated and source documents deduplicated
+        by file name, preserving the order the indexes were queried in.
+
+        Args:
+            results: Successful results from the per-index query methods
+
+        Returns:
+            One combined query result
+        """
+        merged = dict(results[0])
+        merged["response"] = "\n\n".join(
+            r.get("response", "") for r in results if r.get("response")
+        )
+
+        source_texts = []
+        source_documents = []
+        seen_files = set()
+        for result in results:
+            source_texts.extend(result.get("source_texts", []))
+            for doc in result.get("source_documents", []):
+                file_name = doc.get("file_name")
+                if file_name in seen_files:
+                    continue
+                seen_files.add(file_name)
+                source_documents.append(doc)
+
+        merged["source_texts"] = source_texts
+        merged["source_documents"] = source_documents
+        # A single raw response object can't represent the merged set
+        merged.pop("raw_response_object", None)
+        return merged
             
     async def query_knowledge_base(self, query: str, agent_config: Dict[str, Any], similarity_top_k: int = 1, relevance_threshold: float = 0.8) -> Optional[str]:
         """
@@ -770,9 +1144,7 @@ class KnowledgeService:
                 return None
                 
             kb = agent_config["knowledge_base"]
-            print("-------------------------------- ")
-            print(f"kb: {kb}")
-            print("--------------------------------")
+            logger.debug("Knowledge base config: %s", kb)
             agent_name = agent_config.get("name")
             storage_type = kb.get("storage_type")
             index_info = kb.get("index_info")
@@ -783,9 +1155,36 @@ class KnowledgeService:
             
             logger.info(f"Querying {storage_type} knowledge base for agent  with query: {query}")
             logger.info(f"Using relevance threshold: {relevance_threshold}, top_k: {similarity_top_k}")
-            
-            # Use the query_agent_knowledge method with the provided parameters
-            query_result = await self.query_agent_knowledge(agent_name, index_info, storage_type, query, similarity_top_k)
+
+            # Near-duplicate queries against the same knowledge base serve
+            # the previously formatted context by embedding similarity,
+            # skipping retrieval and synthesis entirely
+            cache_namespace = json.dumps(
+                {"kb": kb, "name": agent_name, "k": similarity_top_k, "t": relevance_threshold},
+                sort_keys=True, default=str
+            )
+            # Tier 0: exact-match lookup, cheaper than even one embedding
+            exact_key = hashlib.blake2b(f"{cache_namespace}\x00{query}".encode()).digest()
+            entry = self._exact_cache.get(exact_key)
+            if entry is not None:
+                expiry, cached_context = entry
+                if expiry >= time.monotonic():
+                    self._exact_cache.move_to_end(exact_key)
+                    logger.info("Exact cache hit for knowledge query")
+                    return cached_context
+                del self._exact_cache[exact_key]
+
+            cached_context = await self._semantic_cache.get(cache_namespace, query)
+            if cached_context is not None:
+                logger.info("Semantic cache hit for knowledge query")
+                self._store_exact(exact_key, cached_context)
+                return cached_context
+
+            # Use the query_agent_knowledge method with the provided
+            # parameters. Claude synthesizes the final answer itself, so
+            # retrieval-only mode skips the second LLM pass and hands it
+            # the raw chunks.
+            query_result = await self.query_agent_knowledge(agent_name, index_info, storage_type, query, similarity_top_k, retrieve_only=True)
             
             if not query_result.get("success", False):
                 logger.warning(f"Query failed: {query_result.get('error', 'Unknown error')}")
@@ -822,12 +1221,26 @@ class KnowledgeService:
             
             # Format the response for the agent
             formatted_response = self._format_retrieved_context(query_result)
+
+            # Only successful retrievals are cached - a None result should
+            # be retried, not remembered
+            if formatted_response is not None:
+                self._store_exact(exact_key, formatted_response)
+                await self._semantic_cache.put(cache_namespace, query, formatted_response)
+
             return formatted_response
             
         except Exception as e:
             logger.error(f"Error querying knowledge base: {str(e)}", exc_info=True)
             return f"Error querying knowledge base: {str(e)}"
     
+    def _store_exact(self, key: bytes, context: str) -> None:
+        """Insert a formatted context into the exact-match LRU tier."""
+        self._exact_cache[key] = (time.monotonic() + settings.SEMANTIC_CACHE_TTL, context)
+        self._exact_cache.move_to_end(key)
+        if len(self._exact_cache) > _EXACT_CACHE_SIZE:
+            self._exact_cache.popitem(last=False)
+
     def _format_retrieved_context(self, query_result: Dict[str, Any]) -> str:
         """
         Format the retrieved context for the agent, including source information.
@@ -841,27 +1254,29 @@ class KnowledgeService:
         try:
             if not query_result.get("success", False):
                 return None
-                
-            formatted_text = "Here is the retrieved information from the knowledge base:\n\n"
-            
-            # Add the response text
-            response_text = query_result.get("response", "")
-            formatted_text += response_text + "\n\n"
-            
+
+            # Collect the pieces and join once - repeated += reallocates
+            # the growing string for every source line
+            parts = [
+                "Here is the retrieved information from the knowledge base:\n\n",
+                query_result.get("response", ""),
+                "\n\n",
+            ]
+
             # Add source information if available
             source_docs = query_result.get("source_documents", [])
             if source_docs:
-                formatted_text += "Sources:\n"
+                parts.append("Sources:\n")
                 for i, doc in enumerate(source_docs):
                     file_name = doc.get("file_name", f"Source {i+1}")
                     score = doc.get("score")
-                    
+
                     # Format score with 4 decimal places for precision
                     score_text = f" (relevance score: {score:.4f})" if score is not None else ""
-                    
-                    formatted_text += f"- {file_name}{score_text}\n"
-            
-            return formatted_text
+
+                    parts.append(f"- {file_name}{score_text}\n")
+
+            return "".join(parts)
             
         except Exception as e:
             logger.error(f"Error formatting retrieved context: {str(e)}", exc_info=True)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import math
+from typing import List, Optional
+
+import httpx
+import orjson
+
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# Default llama.cpp server address; override with LLAMA_EMBED_URL
+DEFAULT_EMBED_URL = "http://localhost:8082"
+
+
+class LlamaCppEmbedding(BaseEmbedding):
+    """
+    Embeddings served by a llama.cpp server's OpenAI-compatible
+    /v1/embeddings endpoint.
+
+    Running the embedding model on a GPU-backed server moves the
+    compute-bound part of indexing off this process; batches go out as a
+    single request instead of one round-trip per chunk. Inputs carry the
+    nomic-style ``search_document:`` / ``search_query:`` prefixes so
+    asymmetric models retrieve properly. The embedding dimensionality is
+    detected from the first response, so 384/768/1024-dim models all work
+    without configuration.
+    """
+
+    base_url: str = DEFAULT_EMBED_URL
+    model_name: str = "default"
+    dimensions: Optional[int] = None
+
+    _client: httpx.Client = PrivateAttr()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Keep-alive pool shared by every embedding call from this model
+        self._client = httpx.Client(timeout=httpx.Timeout(60.0, connect=2.0))
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LlamaCppEmbedding"
+
+    def probe(self) -> bool:
+        """
+        Issue one tiny embedding request to confirm the server is
+        reachable, learning the dimensionality as a side effect.
+
+        Returns:
+            True when the server answered with a usable embedding
+        """
+        try:
+            return len(self._embed(["dimension probe"])[0]) > 0
+        except Exception as e:
+            logger.debug(f"llama.cpp embedding probe failed: {str(e)}")
+            return False
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """POST one batch of texts and return their embeddings in order."""
+        response = self._client.post(
+            f"{self.base_url}/v1/embeddings",
+            content=orjson.dumps({"model": self.model_name, "input": texts}),
+            headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+
+        data = orjson.loads(response.content)["data"]
+        # Unit-normalize so inner-product vector stores score by cosine
+        # similarity regardless of whether the server already normalized
+        embeddings = []
+        for item in data:
+            embedding = item["embedding"]
+            norm = math.sqrt(sum(v * v for v in embedding))
+            if norm > 0:
+                embedding = [v / norm for v in embedding]
+            embeddings.append(embedding)
+        if self.dimensions is None and embeddings:
+            self.dimensions = len(embeddings[0])
+        return embeddings
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([f"search_query: {query}"])[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([f"search_document: {text}"])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        # One request per batch - this is the path index builds go through
+        return self._embed([f"search_document: {text}" for text in texts])
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await asyncio.to_thread(self._get_query_embedding, query)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self._get_text_embedding, text)
@@ -13,6 +13,19 @@ logger = logging.getLogger(__name__)
 # Path to the JSON file for storing MCP server data
 MCP_SERVERS_FILE = "mcp_servers.json"
 
+# In-process cache for the parsed server list, keyed by file mtime so edits
+# made outside the process are still picked up. save_mcp_servers refreshes
+# it directly, so the read path normally never touches the disk.
+_servers_cache = {"mtime": None, "data": None, "by_name": None}
+_servers_cache_lock = asyncio.Lock()
+
+
+def _update_servers_cache(mtime, servers):
+    """Store the parsed list plus a name-keyed index for O(1) lookups."""
+    _servers_cache["mtime"] = mtime
+    _servers_cache["data"] = servers
+    _servers_cache["by_name"] = {server["name"]: server for server in servers}
+
 async def process_sse_events(session, response, timeout: int = 30):
     """
     Process SSE events from a connected endpoint.
@@ -47,12 +60,12 @@ async def process_sse_events(session, response, timeout: int = 30):
                 event_type = line[6:].strip()
             elif line.startswith('data:'):
                 data = json.loads(line[5:].strip())
-                print(data)
+                logger.debug("SSE event data: %s", data)
                 
                 # Process initial catalog
                 if event_type == "INITIAL_CATALOG":
                     services_data = data.get("data", [])
-                    print(services_data)
+                    logger.debug("Initial catalog services: %s", services_data)
                     for service_data in services_data:
                         service_id = service_data.get("id")
                         service_name = service_data.get("name")
@@ -89,22 +102,43 @@ async def process_sse_events(session, response, timeout: int = 30):
     return list(discovered_services.values())
 
 async def load_mcp_servers():
-    """Load MCP servers from the JSON file."""
+    """Load MCP servers from the JSON file, served from the mtime-keyed cache when fresh."""
     try:
-        if os.path.exists(MCP_SERVERS_FILE):
+        mtime = os.stat(MCP_SERVERS_FILE).st_mtime
+    except OSError:
+        return []
+
+    if _servers_cache["mtime"] == mtime:
+        return _servers_cache["data"]
+
+    async with _servers_cache_lock:
+        # Another task may have refreshed the cache while we waited
+        if _servers_cache["mtime"] == mtime:
+            return _servers_cache["data"]
+
+        try:
             with open(MCP_SERVERS_FILE, 'r') as f:
-                return json.load(f)
-        else:
+                servers = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading MCP servers: {str(e)}")
             return []
-    except Exception as e:
-        logger.error(f"Error loading MCP servers: {str(e)}")
-        return []
+
+        _update_servers_cache(mtime, servers)
+        return servers
+
+async def load_mcp_servers_by_name():
+    """Load MCP servers as a dict keyed by server name for O(1) lookups."""
+    servers = await load_mcp_servers()
+    if _servers_cache["data"] is servers and _servers_cache["by_name"] is not None:
+        return _servers_cache["by_name"]
+    return {server["name"]: server for server in servers}
 
 async def save_mcp_servers(servers):
-    """Save MCP servers to the JSON file."""
+    """Save MCP servers to the JSON file and refresh the cache in place."""
     try:
         with open(MCP_SERVERS_FILE, 'w') as f:
             json.dump(servers, f, indent=2)
+        _update_servers_cache(os.stat(MCP_SERVERS_FILE).st_mtime, servers)
     except Exception as e:
         logger.error(f"Error saving MCP servers: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error saving MCP servers: {str(e)}")
@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.config.settings import settings
+
+# numpy ships with the llama-index stack but the cache must not take the
+# service down if the environment lacks it - it just disables itself
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Similarity-keyed response cache.
+
+    Lookups embed the query text and return the stored value whose
+    embedding is most similar, when the cosine score clears the configured
+    threshold - so paraphrased repeats ("what's the weather" / "tell me
+    the weather") hit the same entry even though their exact text differs.
+    Entries are partitioned by a caller-supplied namespace (for example the
+    system prompt), expire after a TTL, and are evicted oldest-first at the
+    size bound.
+
+    Embeddings come from the same model that indexes the knowledge base
+    (llama-index ``Settings.embed_model``). If numpy is missing or the
+    embedding model is unusable, the cache disables itself and every
+    lookup is a miss - callers need no fallback logic.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, ttl: Optional[int] = None, max_size: int = 128):
+        self.threshold = threshold if threshold is not None else settings.SEMANTIC_CACHE_THRESHOLD
+        self.ttl = ttl if ttl is not None else settings.SEMANTIC_CACHE_TTL
+        self.max_size = max_size
+        # namespace hash -> {"vectors": (n, d) float32 matrix of normalized
+        # embeddings, "entries": parallel list of (expiry, value)}
+        self._namespaces: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._disabled = not NUMPY_AVAILABLE
+
+    @staticmethod
+    def _namespace_key(namespace: str) -> str:
+        """Hash the namespace so multi-KB prompts don't become dict keys."""
+        return hashlib.sha256(namespace.encode()).hexdigest()
+
+    async def _embed(self, text: str):
+        """L2-normalized embedding of text, or None when unavailable."""
+        if self._disabled:
+            return None
+        try:
+            # Imported lazily so merely constructing the cache never pulls
+            # in the embedding stack
+            from llama_index.core import Settings
+
+            # Embedding backends are blocking HTTP/compute - keep them off
+            # the event loop
+            vector = await asyncio.to_thread(Settings.embed_model.get_text_embedding, text)
+        except Exception as e:
+            logger.warning("Semantic cache disabled - embedding unavailable: %s", str(e))
+            self._disabled = True
+            return None
+
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(arr)
+        if norm == 0:
+            return None
+        return arr / norm
+
+    async def get(self, namespace: str, text: str) -> Optional[Any]:
+        """
+        Return the cached value most similar to text within namespace, or
+        None when nothing clears the similarity threshold (or the entry
+        has expired).
+        """
+        vector = await self._embed(text)
+        if vector is None:
+            return None
+
+        key = self._namespace_key(namespace)
+        now = time.monotonic()
+        async with self._lock:
+            ns = self._namespaces.get(key)
+            if ns is None or not ns["entries"]:
+                return None
+
+            # One matrix-vector product scores every entry at once
+            scores = ns["vectors"] @ vector
+            best = int(scores.argmax())
+            expiry, value = ns["entries"][best]
+            if scores[best] >= self.threshold and expiry >= now:
+                logger.info("Semantic cache hit (score=%.3f)", float(scores[best]))
+                return value
+        return None
+
+    async def put(self, namespace: str, text: str, value: Any):
+        """Store value under text's embedding, evicting oldest-first."""
+        vector = await self._embed(text)
+        if vector is None:
+            return
+
+        key = self._namespace_key(namespace)
+        async with self._lock:
+            ns = self._namespaces.setdefault(key, {
+                "vectors": np.empty((0, vector.shape[0]), dtype=np.float32),
+                "entries": []
+            })
+            ns["vectors"] = np.vstack([ns["vectors"], vector[None, :]])
+            ns["entries"].append((time.monotonic() + self.ttl, value))
+            if len(ns["entries"]) > self.max_size:
+                ns["vectors"] = ns["vectors"][1:]
+                ns["entries"].pop(0)
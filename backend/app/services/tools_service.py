@@ -1,76 +1,217 @@
 import httpx
 import json
+import orjson
 import re
 import logging
+from functools import lru_cache
 from typing import Dict, Any, Tuple, List, Optional
 import asyncio
 
+from pydantic import BaseModel
+
 logger = logging.getLogger(__name__)
 
+
+# Typed view over the MCP server entries in an agent config. Validating once
+# up front replaces the repeated dict .get() walks (with throwaway default
+# strings) that the description loop otherwise performs per endpoint.
+class McpEndpoint(BaseModel):
+    path: str = ""
+    methods: List[str] = []
+    description: str = ""
+    capability: str = ""
+
+
+class McpService(BaseModel):
+    name: str = "Unnamed Service"
+    capabilities: List[str] = []
+    endpoints: List[McpEndpoint] = []
+
+
+class McpServer(BaseModel):
+    base_url: str = "No Base URL Provided"
+    services: List[McpService] = []
+
+# Tool-call sections emitted by the model, compiled once at import
+_TOOL_CALL_RE = re.compile(r'\[TOOLS SELECTED\]\s*(.*?)\s*\[\/TOOLS SELECTED\]', re.DOTALL)
+
+# Anthropic restricts tool names to this alphabet (max 64 characters)
+_TOOL_NAME_RE = re.compile(r'[^a-zA-Z0-9_-]+')
+
+# Agent configs describe endpoints but carry no parameter schemas, so native
+# tool definitions accept an open object and forward it as call parameters
+_OPEN_INPUT_SCHEMA = {
+    "type": "object",
+    "properties": {},
+    "additionalProperties": True,
+}
+
+
+def build_native_tools(agent_config: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Convert the config's tool and MCP metadata into Anthropic native tool
+    definitions for the API's ``tools`` field.
+
+    With native definitions, invocations come back as structured
+    ``tool_use`` content blocks instead of text markers that need regex
+    extraction, and results go back as ``tool_result`` blocks in the same
+    cached conversation.
+
+    Args:
+        agent_config: Complete agent configuration
+
+    Returns:
+        Tuple of (tool definitions for the request body, mapping of tool
+        name to the call spec consumed by ``execute_native_tool``)
+    """
+    tools_schema: List[Dict[str, Any]] = []
+    call_specs: Dict[str, Dict[str, Any]] = {}
+
+    def _add(raw_name: str, description: str, spec: Dict[str, Any]):
+        name = _TOOL_NAME_RE.sub("_", raw_name).strip("_")[:64] or "tool"
+        base = name
+        suffix = 1
+        while name in call_specs:
+            suffix += 1
+            name = f"{base[:60]}_{suffix}"
+        tools_schema.append({
+            "name": name,
+            "description": description,
+            "input_schema": _OPEN_INPUT_SCHEMA,
+        })
+        call_specs[name] = spec
+
+    for tool in agent_config.get("tools", []) or []:
+        endpoint = tool.get("endpoint")
+        if not endpoint:
+            continue
+        tool_name = tool.get("name", "Unknown Tool")
+        _add(
+            tool_name,
+            f"Call the {tool_name} tool at {endpoint}",
+            {"action": "tool", "endpoint": endpoint, "method": tool.get("method", "GET")},
+        )
+
+    for raw_server in agent_config.get("mcp_servers", []) or []:
+        server = McpServer.model_validate(raw_server)
+        for svc in server.services:
+            for ep in svc.endpoints:
+                if not ep.path:
+                    continue
+                _add(
+                    f"{svc.name}_{ep.path}",
+                    ep.description or ep.capability or f"{svc.name} endpoint {ep.path}",
+                    {
+                        "action": "mcp",
+                        "endpoint": f"{server.base_url}{ep.path}",
+                        "method": ep.methods[0] if ep.methods else "GET",
+                    },
+                )
+
+    return tools_schema, call_specs
+
+
+def _build_tools_description(agent_config: Dict[str, Any]) -> str:
+    """
+    Generate a description of available tools and MCP servers from the agent configuration.
+
+    Module-level so callers that cache derived prompts can use it without
+    holding a service instance.
+
+    Args:
+        agent_config: Complete agent configuration
+
+    Returns:
+        Formatted description of available tools and MCP servers
+    """
+    # Extract normal tools, if any. Pieces are collected in lists and joined
+    # once so construction stays linear as tool lists grow.
+    tools = agent_config.get("tools", [])
+    tools_description = ""
+    if tools:
+        tool_lines = "\n".join(
+            f"- {tool.get('name', 'Unknown Tool')}: {tool.get('endpoint', 'No endpoint')}"
+            for tool in tools
+        )
+        tools_description = f"You have access to the following tools:\n\n{tool_lines}\n"
+
+    # Extract MCP servers, if any, and build a description block. Each entry
+    # is validated into the typed model tree once, so the nested loops use
+    # plain attribute access instead of dict .get() chains per endpoint.
+    mcp_servers = agent_config.get("mcp_servers", [])
+    mcp_servers_description = ""
+    if mcp_servers:
+        parts = ["You also have access to the following MCP servers:\n\n"]
+        for raw_server in mcp_servers:
+            server = McpServer.model_validate(raw_server)
+
+            for svc in server.services:
+                parts.append(f"  - Service **{svc.name}** with capabilities: {', '.join(svc.capabilities)}\n")
+
+                for ep in svc.endpoints:
+                    parts.append(
+                        f"    - Base URL: **{server.base_url}**\n"
+                        f"    - Endpoint: `{ep.path}` (methods: {', '.join(ep.methods)})\n"
+                        f"      Description: {ep.description}\n"
+                        f"      Capability: {ep.capability}\n"
+                    )
+
+            parts.append("\n")
+        mcp_servers_description = "".join(parts)
+
+    # Combine both types of tool information; empty blocks are dropped so the
+    # common no-tools case allocates nothing extra
+    return "\n".join(block for block in (tools_description, mcp_servers_description) if block).strip()
+
+
+@lru_cache(maxsize=256)
+def _tools_description_cached(config_key: str) -> str:
+    """Build the description once per distinct config content."""
+    return _build_tools_description(json.loads(config_key))
+
+
+def generate_tools_description(agent_config: Dict[str, Any]) -> str:
+    """
+    Return the tools description for a configuration, memoized by content.
+
+    The description is deterministic for a given config, so repeat requests
+    for the same agent skip the MCP model validation and string assembly.
+
+    Args:
+        agent_config: Complete agent configuration
+
+    Returns:
+        Formatted description of available tools and MCP servers
+    """
+    try:
+        config_key = json.dumps(agent_config, sort_keys=True)
+    except TypeError:
+        # Non-serializable values - build without caching
+        return _build_tools_description(agent_config)
+    return _tools_description_cached(config_key)
+
+
 class ToolsService:
     """Service for processing tool calls detected in Claude responses."""
-    
-    TOOLS_PATTERN = r'\[TOOLS SELECTED\]\s*(.*?)\s*\[\/TOOLS SELECTED\]'
-    
+
+    TOOLS_PATTERN = _TOOL_CALL_RE.pattern
+
     def __init__(self):
         """Initialize the tools service."""
         self.http_client = httpx.AsyncClient(timeout=30.0)  # 30 second timeout
-    
+
     def generate_tools_description(self, agent_config: Dict[str, Any]) -> str:
         """
         Generate a description of available tools and MCP servers from the agent configuration.
-        
+
         Args:
             agent_config: Complete agent configuration
-            
+
         Returns:
             Formatted description of available tools and MCP servers
         """
-        # Extract normal tools, if any
-        tools = agent_config.get("tools", [])
-        tools_description = ""
-        if tools:
-            tools_description = "You have access to the following tools:\n\n"
-            for tool in tools:
-                tool_name = tool.get('name', 'Unknown Tool')
-                tool_endpoint = tool.get('endpoint', 'No endpoint')
-                tools_description += f"- {tool_name}: {tool_endpoint}\n"
-        
-        # Extract MCP servers, if any, and build a description block
-        mcp_servers = agent_config.get("mcp_servers", [])
-        mcp_servers_description = ""
-        if mcp_servers:
-            mcp_servers_description = "You also have access to the following MCP servers:\n\n"
-            for server in mcp_servers:
-                server_name = server.get("name", "Unnamed Server")
-                base_url = server.get("base_url", "No Base URL Provided")
-                # sse_url = server.get("sse_url", "No SSE URL Provided")
-                # mcp_servers_description += f"- **{server_name}** (SSE URL: {sse_url})\n"
-                
-                services = server.get("services", [])
-                for svc in services:
-                    svc_name = svc.get("name", "Unnamed Service")
-                    capabilities = svc.get("capabilities", [])
-                    mcp_servers_description += f"  - Service **{svc_name}** with capabilities: {', '.join(capabilities)}\n"
-                    
-                    endpoints = svc.get("endpoints", [])
-                    for ep in endpoints:
-                        path = ep.get("path", "")
-                        methods = ep.get("methods", [])
-                        desc = ep.get("description", "")
-                        capability = ep.get("capability", "")
-                        mcp_servers_description += (
-                            f"    - Base URL: **{base_url}**\n"
-                            f"    - Endpoint: `{path}` (methods: {', '.join(methods)})\n"
-                            f"      Description: {desc}\n"
-                            f"      Capability: {capability}\n"
-                        )
-                
-                mcp_servers_description += "\n"
-        
-        # Combine both types of tool information
-        return (tools_description + "\n" + mcp_servers_description).strip()
-    
+        return generate_tools_description(agent_config)
+
     async def process_tool_calls(self, claude_response: str) -> str:
         """
         Process any tool calls in the Claude response.
@@ -124,8 +265,8 @@ class ToolsService:
         """
         tool_calls = []
         
-        # Find all tool call sections
-        matches = re.finditer(self.TOOLS_PATTERN, response, re.DOTALL)
+        # Find all tool call sections with the precompiled pattern
+        matches = _TOOL_CALL_RE.finditer(response)
         
         for match in matches:
             tool_call_section = match.group(0)  # The entire matched section
@@ -142,6 +283,21 @@ class ToolsService:
         
         return tool_calls
     
+    async def execute_native_tool(self, spec: Dict[str, Any], tool_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute one native ``tool_use`` invocation described by a call spec.
+
+        Args:
+            spec: Call spec produced by ``build_native_tools``
+            tool_input: The ``input`` object from the tool_use block
+
+        Returns:
+            The result of the tool call
+        """
+        tool_call = dict(spec)
+        tool_call["parameters"] = tool_input or {}
+        return await self._execute_tool_call(tool_call)
+
     async def _execute_tool_call(self, tool_call: Dict[str, Any]) -> Dict[str, Any]:
         """
         Execute a tool call based on the action type.
@@ -285,7 +441,7 @@ class ToolsService:
         Returns:
             Formatted tool result section
         """
-        formatted_result = json.dumps(result, indent=2)
+        formatted_result = orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
         action_type = tool_call.get("action", "unknown")
         endpoint = tool_call.get("endpoint", "unknown")
         
@@ -1,22 +1,66 @@
+import os
 import yaml
 from typing import Dict, Any, List
+from collections import OrderedDict
 import logging
 import json
+import orjson
 import asyncio
-from app.services.mcp_services import load_mcp_servers
+from app.services.mcp_services import load_mcp_servers, MCP_SERVERS_FILE
 from datetime import datetime
 logger = logging.getLogger(__name__)
 
-async def generate_yaml_async(agent_config: Dict[str, Any]) -> str:
+# Resolved configs keyed by (sorted config bytes, MCP file mtime) - repeat
+# tests against the same agent skip the whole resolution pass. The mtime in
+# the key invalidates entries when the MCP server registry changes.
+_config_cache = OrderedDict()
+_CONFIG_CACHE_SIZE = 128
+
+# Use the libyaml C emitter when the extension is available - the structure
+# dumped here is plain dicts/lists/strings, so SafeDumper semantics suffice
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+async def build_complete_config(agent_config: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Generate a YAML configuration file from the agent configuration with async support for fetching MCP server details.
-    
+    Resolve an agent configuration into the complete config dict that the
+    YAML file is generated from.
+
+    Callers that need the finalized structure (e.g. test_agent) can use this
+    directly and skip the YAML dump/parse round-trip entirely. Results are
+    cached per config content, so callers must treat the returned dict as
+    read-only; the created_at field reflects when the entry was first built.
+
     Args:
         agent_config: Complete agent configuration
-        
+
     Returns:
-        Formatted YAML as a string
+        The finalized configuration dict
     """
+    try:
+        config_key = orjson.dumps(agent_config, option=orjson.OPT_SORT_KEYS)
+    except TypeError:
+        # Non-serializable values - resolve without caching
+        return await _build_complete_config(agent_config)
+
+    try:
+        mcp_mtime = os.stat(MCP_SERVERS_FILE).st_mtime
+    except OSError:
+        mcp_mtime = None
+
+    cache_key = (config_key, mcp_mtime)
+    cached = _config_cache.get(cache_key)
+    if cached is not None:
+        _config_cache.move_to_end(cache_key)
+        return cached
+
+    resolved = await _build_complete_config(agent_config)
+    _config_cache[cache_key] = resolved
+    if len(_config_cache) > _CONFIG_CACHE_SIZE:
+        _config_cache.popitem(last=False)
+    return resolved
+
+async def _build_complete_config(agent_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Uncached resolution pass behind build_complete_config."""
     try:
         # Create the YAML structure
         yaml_structure = {
@@ -171,25 +215,55 @@ In normal mode, provide only the response without the analytical sections."""
             # Only add knowledge_base if we have valid information
             if knowledge_section:
                 yaml_structure["knowledge_base"] = knowledge_section
-        
-        # Convert to YAML
-        yaml_content = yaml.dump(yaml_structure, sort_keys=False, default_flow_style=False)
-        
-        # Format the instruction to use the YAML pipe syntax
-        if "instruction" in yaml_structure:
-            # Replace the single line instruction with a proper multiline format
-            instruction_line = f"instruction: {yaml_structure['instruction']}"
-            multiline_instruction = f"instruction: |\n"
-            
-            # Split the instruction into lines and indent them
-            for line in yaml_structure["instruction"].split("\n"):
-                multiline_instruction += f"  {line}\n"
-                
-            # Replace in the generated YAML
-            yaml_content = yaml_content.replace(instruction_line, multiline_instruction.rstrip())
-        
-        return yaml_content
-        
+
+        return yaml_structure
+
+    except Exception as e:
+        logger.error(f"Error generating YAML: {e}")
+        raise Exception(f"Error generating YAML: {str(e)}")
+
+def _dump_yaml(yaml_structure: Dict[str, Any]) -> str:
+    """
+    Serialize a finalized config dict to the YAML string format.
+
+    Pure CPU work, kept synchronous so generate_yaml_async can push it onto
+    a worker thread.
+    """
+    # Convert to YAML
+    yaml_content = yaml.dump(yaml_structure, Dumper=_YAML_DUMPER, sort_keys=False, default_flow_style=False)
+
+    # Format the instruction to use the YAML pipe syntax
+    if "instruction" in yaml_structure:
+        # Replace the single line instruction with a proper multiline format
+        instruction_line = f"instruction: {yaml_structure['instruction']}"
+        multiline_instruction = f"instruction: |\n"
+
+        # Split the instruction into lines and indent them
+        for line in yaml_structure["instruction"].split("\n"):
+            multiline_instruction += f"  {line}\n"
+
+        # Replace in the generated YAML
+        yaml_content = yaml_content.replace(instruction_line, multiline_instruction.rstrip())
+
+    return yaml_content
+
+async def generate_yaml_async(agent_config: Dict[str, Any]) -> str:
+    """
+    Generate a YAML configuration file from the agent configuration with async support for fetching MCP server details.
+
+    Args:
+        agent_config: Complete agent configuration
+
+    Returns:
+        Formatted YAML as a string
+    """
+    try:
+        yaml_structure = await build_complete_config(agent_config)
+
+        # The PyYAML emitter is CPU-bound - run it off the event loop so
+        # concurrent requests are not stalled behind serialization
+        return await asyncio.to_thread(_dump_yaml, yaml_structure)
+
     except Exception as e:
         logger.error(f"Error generating YAML: {e}")
         raise Exception(f"Error generating YAML: {str(e)}")
@@ -86,7 +86,8 @@ class TestKnowledgeService:
         
         upload_file = MagicMock(spec=UploadFile)
         upload_file.filename = filename
-        upload_file.read = AsyncMock(return_value=file_content)
+        # Mimic chunked reads: return the content once, then EOF
+        upload_file.read = AsyncMock(side_effect=[file_content, b""])
         
         return upload_file
     
@@ -1,86 +1,212 @@
 import re
 import json
 import logging
-from typing import Union, List, Dict, Any, Optional
+from typing import Union, List, Dict, Any, Optional, Tuple
 
 from app.models.response_models import ConfigUpdate
 
 logger = logging.getLogger(__name__)
 
-def extract_config_updates(response: str) -> Optional[Union[ConfigUpdate, List[ConfigUpdate]]]:
+# Compiled once at import time - a single alternation matches every special tag
+# so the response only needs one scan instead of one pass per tag type
+_TAG_PATTERN = re.compile(r'\[(CONFIG_UPDATE|GENERATE_YAML|PROMPT_KNOWLEDGE_UPLOAD)\]([\s\S]*?)\[\/\1\]')
+
+_TRUTHY_VALUES = ('true', '1', 'yes')
+
+
+def _parse_config_update(raw: str) -> Optional[Union[ConfigUpdate, List[ConfigUpdate]]]:
     """
-    Extract configuration updates from Claude's response.
-    
+    Parse the JSON body of a CONFIG_UPDATE block into ConfigUpdate objects.
+
     Args:
-        response: Claude's raw response text
-        
+        raw: Raw text between the CONFIG_UPDATE tags
+
     Returns:
-        Either a single ConfigUpdate, a list of ConfigUpdate objects, or None if no updates found
+        Either a single ConfigUpdate, a list of ConfigUpdate objects, or None on parse failure
     """
-    # Pattern to match CONFIG_UPDATE blocks
-    config_update_pattern = r'\[CONFIG_UPDATE\]([\s\S]*?)\[\/CONFIG_UPDATE\]'
-    matches = re.findall(config_update_pattern, response)
-    
-    if not matches:
-        return None
-    
     try:
-        # Parse the first match
-        update_data = json.loads(matches[0].strip())
-        
+        update_data = json.loads(raw.strip())
+
         # Check if it's a list or single object
         if isinstance(update_data, list):
             # Multiple updates
-            updates = []
-            for item in update_data:
-                updates.append(ConfigUpdate(field=item["field"], value=item["value"]))
-            return updates
+            return [ConfigUpdate(field=item["field"], value=item["value"]) for item in update_data]
         else:
             # Single update
             return ConfigUpdate(field=update_data["field"], value=update_data["value"])
-            
+
     except json.JSONDecodeError as e:
         logger.error(f"Error parsing CONFIG_UPDATE JSON: {e}")
-        logger.error(f"Raw content: {matches[0]}")
+        logger.error(f"Raw content: {raw}")
         return None
-        
+
     except KeyError as e:
         logger.error(f"Missing key in CONFIG_UPDATE: {e}")
         return None
 
+
+def parse_response(response: str) -> Tuple[str, Optional[Union[ConfigUpdate, List[ConfigUpdate]]], bool, bool]:
+    """
+    Parse Claude's response in a single pass, extracting all special tags.
+
+    Args:
+        response: Claude's raw response text
+
+    Returns:
+        Tuple of (cleaned response, config updates or None,
+        generate_yaml flag, prompt_knowledge_upload flag)
+    """
+    # Most conversational turns carry no tags at all - a cheap substring scan
+    # lets those skip the regex sweep and return the text untouched
+    if '[' not in response or not (
+        '[CONFIG_UPDATE]' in response
+        or '[GENERATE_YAML]' in response
+        or '[PROMPT_KNOWLEDGE_UPLOAD]' in response
+    ):
+        return response.strip(), None, False, False
+
+    config_updates = None
+    generate_yaml = False
+    prompt_knowledge_upload = False
+
+    for match in _TAG_PATTERN.finditer(response):
+        tag, body = match.group(1), match.group(2)
+        if tag == 'CONFIG_UPDATE':
+            if config_updates is None:
+                config_updates = _parse_config_update(body)
+        elif tag == 'GENERATE_YAML':
+            generate_yaml = body.strip().lower() in _TRUTHY_VALUES
+        elif tag == 'PROMPT_KNOWLEDGE_UPLOAD':
+            prompt_knowledge_upload = body.strip().lower() in _TRUTHY_VALUES
+
+    cleaned = _TAG_PATTERN.sub('', response).strip()
+
+    return cleaned, config_updates, generate_yaml, prompt_knowledge_upload
+
+
+class StreamingTagParser:
+    """
+    Incremental version of parse_response for streamed Claude output.
+
+    Feed text deltas as they arrive; clean text between tags is returned
+    immediately while tag bodies are accumulated and parsed when the closing
+    tag is seen, so the full response never needs to be buffered or re-scanned.
+    """
+
+    _OPEN_PATTERN = re.compile(r'\[(CONFIG_UPDATE|GENERATE_YAML|PROMPT_KNOWLEDGE_UPLOAD)\]')
+    _OPEN_LITERALS = ('[CONFIG_UPDATE]', '[GENERATE_YAML]', '[PROMPT_KNOWLEDGE_UPLOAD]')
+
+    def __init__(self):
+        self._buffer = ""
+        self._current_tag = None
+        self.config_updates = None
+        self.generate_yaml = False
+        self.prompt_knowledge_upload = False
+
+    def _handle_tag(self, tag: str, body: str) -> None:
+        if tag == 'CONFIG_UPDATE':
+            if self.config_updates is None:
+                self.config_updates = _parse_config_update(body)
+        elif tag == 'GENERATE_YAML':
+            self.generate_yaml = body.strip().lower() in _TRUTHY_VALUES
+        elif tag == 'PROMPT_KNOWLEDGE_UPLOAD':
+            self.prompt_knowledge_upload = body.strip().lower() in _TRUTHY_VALUES
+
+    def feed(self, chunk: str) -> str:
+        """
+        Feed a text delta and return any clean text that is safe to emit.
+        """
+        self._buffer += chunk
+        output = []
+
+        while True:
+            if self._current_tag is not None:
+                # Inside a tag - wait for its closing literal
+                closing = f'[/{self._current_tag}]'
+                idx = self._buffer.find(closing)
+                if idx == -1:
+                    break
+                self._handle_tag(self._current_tag, self._buffer[:idx])
+                self._buffer = self._buffer[idx + len(closing):]
+                self._current_tag = None
+                continue
+
+            match = self._OPEN_PATTERN.search(self._buffer)
+            if match:
+                output.append(self._buffer[:match.start()])
+                self._current_tag = match.group(1)
+                self._buffer = self._buffer[match.end():]
+                continue
+
+            # No complete tag - emit everything except a tail that could still
+            # turn out to be the start of a tag once more text arrives
+            idx = self._buffer.rfind('[')
+            if idx != -1 and any(lit.startswith(self._buffer[idx:]) for lit in self._OPEN_LITERALS):
+                output.append(self._buffer[:idx])
+                self._buffer = self._buffer[idx:]
+            else:
+                output.append(self._buffer)
+                self._buffer = ""
+            break
+
+        return "".join(output)
+
+    def close(self) -> str:
+        """
+        Flush any remaining buffered text once the stream has ended.
+        """
+        if self._current_tag is not None:
+            # Unterminated tag - treat it as plain text
+            remaining = f'[{self._current_tag}]{self._buffer}'
+            self._current_tag = None
+        else:
+            remaining = self._buffer
+        self._buffer = ""
+        return remaining
+
+
+def extract_config_updates(response: str) -> Optional[Union[ConfigUpdate, List[ConfigUpdate]]]:
+    """
+    Extract configuration updates from Claude's response.
+
+    Args:
+        response: Claude's raw response text
+
+    Returns:
+        Either a single ConfigUpdate, a list of ConfigUpdate objects, or None if no updates found
+    """
+    for match in _TAG_PATTERN.finditer(response):
+        if match.group(1) == 'CONFIG_UPDATE':
+            return _parse_config_update(match.group(2))
+
+    return None
+
+
 def should_generate_yaml(response: str) -> bool:
     """
     Check if YAML should be generated based on Claude's response.
-    
+
     Args:
         response: Claude's raw response text
-        
+
     Returns:
         True if YAML should be generated, False otherwise
     """
-    yaml_pattern = r'\[GENERATE_YAML\]([\s\S]*?)\[\/GENERATE_YAML\]'
-    match = re.search(yaml_pattern, response)
-    
-    if match:
-        value = match.group(1).strip().lower()
-        return value in ['true', '1', 'yes']
-        
+    for match in _TAG_PATTERN.finditer(response):
+        if match.group(1) == 'GENERATE_YAML':
+            return match.group(2).strip().lower() in _TRUTHY_VALUES
+
     return False
 
+
 def clean_response(response: str) -> str:
     """
     Remove special tags from Claude's response before sending to the client.
-    
+
     Args:
         response: Claude's raw response text
-        
+
     Returns:
         Cleaned response with special tags removed
     """
-    # Remove CONFIG_UPDATE blocks
-    cleaned = re.sub(r'\[CONFIG_UPDATE\][\s\S]*?\[\/CONFIG_UPDATE\]', '', response)
-    
-    # Remove GENERATE_YAML blocks
-    cleaned = re.sub(r'\[GENERATE_YAML\][\s\S]*?\[\/GENERATE_YAML\]', '', cleaned)
-    
-    return cleaned.strip()
\ No newline at end of file
+    return _TAG_PATTERN.sub('', response).strip()
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { X, RefreshCw, Check, Server, Plus } from 'lucide-react';
+import { addMcpServer } from '../services/api';
 import '../styles/components.css';
 
 /**
@@ -34,32 +35,21 @@ const MCPServerSelection = ({ mcpServers, selectedServers, onSelectServers, onCa
     try {
       setAddingServer(true);
       setError(null);
-      
-      // Call the backend API to add a new server
-      const response = await fetch('http://localhost:8000/api/mcp-servers/add', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Accept': 'application/json'
-        },
-        body: JSON.stringify(newServer)
-      });
-      
-      if (response.ok) {
-        // Close modal and reset form
-        setShowAddModal(false);
-        setNewServer({ name: '', sse_url: '' });
-        
-        // Refresh the server list
-        // In a real implementation, you might want to update the mcpServers list
-        // by receiving the updated list from the parent component or refetching it
-        window.location.reload(); // Simple solution for demo
-      } else {
-        const error = await response.text();
-        setError(`Failed to add server: ${error}`);
-      }
+
+      // Submit the server and wait for background discovery to finish;
+      // addMcpServer polls the status endpoint until the task completes
+      await addMcpServer(newServer);
+
+      // Close modal and reset form
+      setShowAddModal(false);
+      setNewServer({ name: '', sse_url: '' });
+
+      // Refresh the server list
+      // In a real implementation, you might want to update the mcpServers list
+      // by receiving the updated list from the parent component or refetching it
+      window.location.reload(); // Simple solution for demo
     } catch (err) {
-      setError(`Error: ${err.message}`);
+      setError(`Failed to add server: ${err.message}`);
     } finally {
       setAddingServer(false);
     }
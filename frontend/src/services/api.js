@@ -502,15 +502,54 @@ export const getMcpServers = async () => {
   }
 };
 
+/**
+ * Poll a background MCP discovery task until it finishes
+ * @param {string} taskId - Task id returned by the add/refresh endpoints
+ * @returns {Promise} - Promise that resolves to the completed task record
+ */
+export const waitForMcpServerTask = async (taskId, { interval = 1000, timeout = 60000 } = {}) => {
+  const deadline = Date.now() + timeout;
+
+  while (true) {
+    const response = await fetch(`${API_BASE_URL}/api/mcp-servers/status/${taskId}`, {
+      method: 'GET',
+      headers: {
+        'Accept': 'application/json',
+      }
+    });
+
+    if (!response.ok) {
+      throw new Error(`Server error: ${response.status} ${response.statusText}`);
+    }
+
+    const task = await response.json();
+    if (task.status === 'completed') {
+      return task;
+    }
+    if (task.status === 'failed') {
+      throw new Error(task.detail || 'MCP server discovery failed');
+    }
+    if (Date.now() > deadline) {
+      throw new Error('Timed out waiting for MCP server discovery');
+    }
+
+    await new Promise(resolve => setTimeout(resolve, interval));
+  }
+};
+
 /**
  * Add a new MCP server
+ *
+ * The backend answers 202 with a task id while discovery runs in the
+ * background, so this polls the status endpoint and resolves only once
+ * the server is registered (or discovery failed).
  * @param {Object} serverInfo - Server information { name, sse_url }
- * @returns {Promise} - Promise that resolves to the API response
+ * @returns {Promise} - Promise that resolves to the completed task record
  */
 export const addMcpServer = async (serverInfo) => {
   try {
     console.log("Adding new MCP server:", serverInfo);
-    
+
     const response = await fetch(`${API_BASE_URL}/api/mcp-servers/add`, {
       method: 'POST',
       headers: {
@@ -519,11 +558,11 @@ export const addMcpServer = async (serverInfo) => {
       },
       body: JSON.stringify(serverInfo)
     });
-    
+
     if (!response.ok) {
       const errorText = await response.text();
       console.error('API Error Response:', errorText);
-      
+
       try {
         const errorData = JSON.parse(errorText);
         throw new Error(errorData.detail || 'Error adding MCP server');
@@ -531,8 +570,12 @@ export const addMcpServer = async (serverInfo) => {
         throw new Error(`Server error: ${response.status} ${response.statusText}`);
       }
     }
-    
-    return await response.json();
+
+    const data = await response.json();
+    if (data.task_id) {
+      return await waitForMcpServerTask(data.task_id);
+    }
+    return data;
   } catch (error) {
     console.error('Error adding MCP server:', error);
     throw error;